@@ -0,0 +1 @@
+"""Offline benchmarks: fake upstreams (fakes), microbenchmarks (micro) and a load generator (load)"""
@@ -0,0 +1,318 @@
+"""Deterministic local stand-ins for Groq, ElevenLabs and Data.gov.in.
+
+One threaded HTTP server answers all three wire protocols, so the real
+clients (ChatGroq, the Groq SDK, the shared requests/httpx sessions) are
+exercised unchanged; point GROQ_BASE_URL, ELEVENLABS_BASE_URL and
+DATA_GOV_API_URL at it (see ``FakeUpstreams.env``).
+
+- Chat completions are scripted: a price or scheme question gets the matching
+  tool call, the answer prompt carrying tool results gets an answer built
+  from them, anything else a fixed JSON answer. ``stream=True`` requests get
+  the same reply as server-sent events, a few characters per chunk.
+- Transcriptions cycle through SCRIPTED_TRANSCRIPTS.
+- Text-to-speech returns ``TTS_BYTES_PER_CHAR`` bytes per character, streamed in blocks.
+- The Data.gov.in resource pages through a generated (or recorded) dataset.
+
+Each upstream has a fixed latency so runs are comparable. Run it standalone
+with ``python -m benchmarks.fakes --port 8765``.
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+COMMODITIES = ["Tomato", "Wheat", "Rice", "Onion", "Potato", "Maize", "Cotton", "Soyabean", "Mustard", "Gram"]
+STATES = ["Uttar Pradesh", "Maharashtra", "Punjab", "Madhya Pradesh", "Rajasthan", "Karnataka",
+          "Gujarat", "Bihar", "Haryana", "Tamil Nadu"]
+
+SCRIPTED_TRANSCRIPTS = [
+    ("What is the price of tomato in Maharashtra today?", "english"),
+    ("गेहूं का भाव पंजाब में क्या है?", "hindi"),
+    ("Is there any government scheme that gives money directly to small farmers?", "english"),
+    ("When should I give the first irrigation to wheat?", "english"),
+]
+
+TTS_BYTES_PER_CHAR = 120
+PRICE_WORDS = re.compile(r"price|rate|bhav|भाव|mandi|मंडी|दाम", re.IGNORECASE)
+SCHEME_WORDS = re.compile(r"scheme|yojana|योजना|subsidy|support", re.IGNORECASE)
+# main.enhanced_prompt puts the tool output into the answer prompt's transcript
+TOOL_RESULTS = re.compile(r"Additional information: (.*?)\n\nRespond naturally", re.DOTALL)
+STREAM_CHUNK_CHARS = 8
+
+
+def generate_records(count: int, days: int = 30) -> list:
+    """``count`` mandi price records spread over the last ``days`` days, newest first"""
+    today = date.today()
+    records = []
+    for i in range(count):
+        commodity = COMMODITIES[i % len(COMMODITIES)]
+        state = STATES[(i // len(COMMODITIES)) % len(STATES)]
+        day = today - timedelta(days=(i * days) // max(count, 1))
+        modal = 1000 + (i * 37) % 4000
+        records.append({
+            "state": state,
+            "district": f"{state} District {i % 7}",
+            "market": f"{state.split()[0]} Mandi {i % 13}",
+            "commodity": commodity,
+            "variety": "Other",
+            "grade": "FAQ",
+            "arrival_date": day.strftime("%d/%m/%Y"),
+            "min_price": str(modal - 200),
+            "max_price": str(modal + 200),
+            "modal_price": str(modal),
+        })
+    return records
+
+
+def fake_env(url: str) -> dict:
+    """Environment that points every client of the pipeline at fakes served from ``url``"""
+    url = url.rstrip("/")
+    return {
+        "GROQ_BASE_URL": url,
+        "GROQ_API_KEY": "fake",
+        "ELEVENLABS_BASE_URL": url,
+        "ELEVENLABS_API_KEY": "fake",
+        "DATA_GOV_API_URL": f"{url}/resource/fake",
+        "DATA_GOV_API": "fake",
+    }
+
+
+def _mentioned(text: str, names: list, default: str) -> str:
+    lowered = text.lower()
+    return next((name for name in names if name.lower() in lowered), default)
+
+
+def script_reply(body: dict) -> dict:
+    """The assistant message a scripted model returns for this request"""
+    messages = body.get("messages", [])
+    last = messages[-1] if messages else {}
+    question = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    if body.get("tools") and last.get("role") == "user":
+        if PRICE_WORDS.search(question):
+            args = {"crop": _mentioned(question, COMMODITIES, "tomato"), "location": _mentioned(question, STATES, "")}
+            return _tool_call("get_market_price", args)
+        if SCHEME_WORDS.search(question):
+            return _tool_call("search_schemes", {"query": question, "k": 3})
+    tool_results = TOOL_RESULTS.search(question)
+    tool_result = tool_results.group(1) if tool_results else None
+    if tool_result:
+        answer = f"Here is what I found: {str(tool_result)[:160]}. Please check your local mandi before selling."
+    else:
+        answer = "Give the first irrigation about 20-25 days after sowing, at the crown root stage."
+    return {"role": "assistant", "content": json.dumps({"response": answer}, ensure_ascii=False)}
+
+
+def _tool_call(name: str, args: dict) -> dict:
+    return {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [{
+            "id": f"call_{name}",
+            "type": "function",
+            "function": {"name": name, "arguments": json.dumps(args, ensure_ascii=False)},
+        }],
+    }
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeUpstreams/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, payload, status: int = 200):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _pause(self, upstream: str):
+        delay = self.server.latency.get(upstream, 0)
+        if delay:
+            time.sleep(delay)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith("/resource/"):
+            return self._datagov(parse_qs(url.query))
+        self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self._read_body()
+        if path.endswith("/chat/completions"):
+            return self._chat(json.loads(body or b"{}"))
+        if path.endswith("/audio/transcriptions"):
+            return self._transcription()
+        if "/text-to-speech/" in path:
+            return self._tts(json.loads(body or b"{}"), stream=path.endswith("/stream"))
+        self._send_json({"error": "not found"}, 404)
+
+    def _datagov(self, query: dict):
+        self._pause("datagov")
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", ["10"])[0])
+        records = self.server.records
+        self._send_json({"records": records[offset:offset + limit], "total": len(records),
+                         "count": len(records[offset:offset + limit])})
+
+    def _chat(self, body: dict):
+        self._pause("groq")
+        message = script_reply(body)
+        if body.get("stream"):
+            return self._chat_stream(body, message)
+        prompt_chars = sum(len(str(m.get("content") or "")) for m in body.get("messages", []))
+        completion = len(str(message.get("content") or "")) // 4 + 1
+        self._send_json({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+            }],
+            "usage": {"prompt_tokens": prompt_chars // 4 + 1, "completion_tokens": completion,
+                      "total_tokens": prompt_chars // 4 + 1 + completion},
+        })
+
+    def _chat_stream(self, body: dict, message: dict):
+        # Close-delimited body: the latency above is the time to the first token
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta: dict, finish_reason=None):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        if message.get("tool_calls"):
+            calls = [{"index": i, **call} for i, call in enumerate(message["tool_calls"])]
+            event({"role": "assistant", "content": None, "tool_calls": calls})
+            event({}, "tool_calls")
+        else:
+            content = message["content"]
+            event({"role": "assistant", "content": ""})
+            for start in range(0, len(content), STREAM_CHUNK_CHARS):
+                event({"content": content[start:start + STREAM_CHUNK_CHARS]})
+            event({}, "stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _transcription(self):
+        self._pause("stt")
+        with self.server.lock:
+            text, language = SCRIPTED_TRANSCRIPTS[self.server.transcripts % len(SCRIPTED_TRANSCRIPTS)]
+            self.server.transcripts += 1
+        self._send_json({"text": text, "language": language, "duration": 4.0, "segments": []})
+
+    def _tts(self, body: dict, stream: bool):
+        audio = b"\xff\xf3" * (len(body.get("text", "")) * TTS_BYTES_PER_CHAR // 2)
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Content-Length", str(len(audio)))
+        self.end_headers()
+        if not stream:
+            self._pause("tts")
+            self.wfile.write(audio)
+            return
+        # Time to first byte is the configured latency; the rest trickles out in blocks
+        self._pause("tts")
+        for start in range(0, len(audio), 4096):
+            self.wfile.write(audio[start:start + 4096])
+            self.wfile.flush()
+
+
+class FakeUpstreams:
+    """Runs the fake server on a background thread: ``with FakeUpstreams() as fake: ...``"""
+
+    def __init__(self, port: int = 0, records: list = None, record_count: int = 5000, latency: dict = None):
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), FakeUpstreamHandler)
+        self.server.daemon_threads = True
+        self.server.records = records if records is not None else generate_records(record_count)
+        self.server.latency = {"groq": 0.0, "stt": 0.0, "tts": 0.0, "datagov": 0.0, **(latency or {})}
+        self.server.transcripts = 0
+        self.server.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def env(self) -> dict:
+        return fake_env(self.url)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-upstreams", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def latency_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--llm-ms", type=float, default=300, help="latency of each chat completion")
+    parser.add_argument("--stt-ms", type=float, default=400)
+    parser.add_argument("--tts-ms", type=float, default=250, help="time to first audio byte")
+    parser.add_argument("--datagov-ms", type=float, default=150)
+    parser.add_argument("--records", type=int, default=5000, help="size of the generated price dataset")
+    parser.add_argument("--dataset", help="JSON file of recorded Data.gov.in records to serve instead")
+
+
+def upstreams_from_args(args, port: int = 0) -> FakeUpstreams:
+    records = None
+    if args.dataset:
+        with open(args.dataset, encoding="utf-8") as f:
+            records = json.load(f)
+        records = records.get("records", records) if isinstance(records, dict) else records
+    latency = {"groq": args.llm_ms / 1000, "stt": args.stt_ms / 1000,
+               "tts": args.tts_ms / 1000, "datagov": args.datagov_ms / 1000}
+    return FakeUpstreams(port=port, records=records, record_count=args.records, latency=latency)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    latency_args(parser)
+    args = parser.parse_args(argv)
+    fake = upstreams_from_args(args, port=args.port)
+    print(json.dumps(fake.env, indent=2))
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
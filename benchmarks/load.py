@@ -0,0 +1,171 @@
+"""Concurrent end-to-end load generator against fake upstreams, reported as JSON.
+
+    python -m benchmarks.load --requests 500 --concurrency 32 --output load.json
+    python -m benchmarks.load --mode voice --llm-ms 300 --tts-ms 250
+    python -m benchmarks.load --url http://127.0.0.1:8000   # a running server.py
+
+In-process modes drive main.aget_response (``chat``), main.astream_response
+(``stream``, time-to-first-token reported) or STT -> chat -> TTS (``voice``,
+streaming TTS with time-to-first-audio reported) with the
+upstreams replaced by benchmarks.fakes. ``--upstream`` points at fakes
+started separately (``python -m benchmarks.fakes``) so they don't share this
+process's GIL.
+"""
+import argparse
+import asyncio
+import itertools
+import tempfile
+import time
+
+from .fakes import SCRIPTED_TRANSCRIPTS, fake_env, latency_args, upstreams_from_args
+from .report import configure, summarise, write_report
+
+SAMPLE_AUDIO = b"ID3" + b"\x00" * 32000  # the fake STT ignores the content
+
+
+async def run_load(request, total: int, concurrency: int, first_key: str = "time_to_first_audio") -> dict:
+    """Closed loop: ``concurrency`` workers issue ``total`` requests back to back.
+
+    A request may return the time its first audio (or token) arrived, summarised under ``first_key``.
+    """
+    counter = itertools.count()
+    latencies, first_audio, errors = [], [], []
+
+    async def worker(worker_id: int):
+        while True:
+            n = next(counter)
+            if n >= total:
+                return
+            started = time.perf_counter()
+            try:
+                ttfa = await request(n, f"bench-{worker_id}")
+                if ttfa is not None:
+                    first_audio.append(ttfa - started)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "requests": total,
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "latency": summarise(latencies),
+    }
+    if first_audio:
+        result[first_key] = summarise(first_audio)
+    if errors:
+        result["error_samples"] = sorted(set(errors))[:5]
+    return result
+
+
+def chat_request():
+    from main import aget_response
+
+    async def request(n: int, session_id: str):
+        transcript, language = SCRIPTED_TRANSCRIPTS[n % len(SCRIPTED_TRANSCRIPTS)]
+        await aget_response(transcript, language, session_id)
+
+    return request
+
+
+def stream_request():
+    from main import astream_response
+
+    async def request(n: int, session_id: str):
+        transcript, language = SCRIPTED_TRANSCRIPTS[n % len(SCRIPTED_TRANSCRIPTS)]
+        first = None
+        async for _ in astream_response(transcript, language, session_id):
+            first = first or time.perf_counter()
+        return first
+
+    return request
+
+
+def voice_request():
+    from main import aget_response
+    from models import aspeech_to_text, atext_to_speech_stream
+
+    async def request(n: int, session_id: str):
+        document = await aspeech_to_text(SAMPLE_AUDIO, "note.mp3")
+        answer = await aget_response(document.page_content, document.metadata["language"], session_id)
+        first = None
+        async for _ in atext_to_speech_stream(answer):
+            first = first or time.perf_counter()
+        return first
+
+    return request
+
+
+def http_request(url: str, client):
+    async def request(n: int, session_id: str):
+        transcript, language = SCRIPTED_TRANSCRIPTS[n % len(SCRIPTED_TRANSCRIPTS)]
+        response = await client.post(f"{url.rstrip('/')}/chat", json={
+            "transcript": transcript, "language": language, "session_id": session_id})
+        response.raise_for_status()
+
+    return request
+
+
+async def run(args) -> dict:
+    if args.url:
+        import httpx
+
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+            return await run_load(http_request(args.url, client), args.requests, args.concurrency)
+    request = {"voice": voice_request, "stream": stream_request}.get(args.mode, chat_request)()
+    first_key = "time_to_first_token" if args.mode == "stream" else "time_to_first_audio"
+    if args.warmup:
+        await run_load(request, args.warmup, min(args.warmup, args.concurrency), first_key)
+    return await run_load(request, args.requests, args.concurrency, first_key)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["chat", "stream", "voice"], default="chat")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=8, help="untimed requests before the run")
+    parser.add_argument("--url", help="load a running server.py over HTTP instead of in-process")
+    parser.add_argument("--upstream", help="base URL of fakes started separately")
+    parser.add_argument("--response-cache", action="store_true",
+                        help="keep the response cache on (off by default, every request runs the graph)")
+    parser.add_argument("--tts-cache", action="store_true", help="keep the TTS audio cache on")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    latency_args(parser)
+    args = parser.parse_args(argv)
+
+    fake = None
+    scratch = tempfile.TemporaryDirectory()
+    if not args.url:
+        if not args.upstream:
+            fake = upstreams_from_args(args).start()
+        configure({
+            **fake_env(args.upstream or fake.url),
+            "RESPONSE_CACHE_SIZE": "1024" if args.response_cache else "0",
+            "PRICE_DB_PATH": f"{scratch.name}/prices.db",
+            "TTS_CACHE_DIR": f"{scratch.name}/tts",
+            **({} if args.tts_cache else {"TTS_CACHE_MAX_MB": "0", "TTS_CACHE_MEMORY_ITEMS": "0"}),
+        })
+
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        if fake:
+            fake.stop()
+        scratch.cleanup()
+
+    settings = {k: getattr(args, k) for k in ("mode", "llm_ms", "stt_ms", "tts_ms", "datagov_ms", "records")}
+    write_report({"benchmark": "load", "target": args.url or "in-process", "settings": settings, **result},
+                 args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Microbenchmarks for the hot lookups and CPU inference, reported as JSON.
+
+    python -m benchmarks.micro --repeat 200 --output micro.json
+    python -m benchmarks.micro --only prices,schemes
+
+``prices`` times get_market_price matching against a local store filled with
+a generated dataset, ``schemes`` the Find_scheme / search_schemes /
+Scheme_detials tools on the real catalogue, and ``inference`` predict_image,
+predict_image_wheat and the batched variants on CPU. Without MODEL_PATH /
+WHEAT_MODE_PATH the networks keep random weights, which costs the same.
+"""
+import argparse
+import io
+import os
+import tempfile
+
+from .fakes import generate_records
+from .report import configure, measure, write_report
+
+PRICE_QUERIES = [
+    ("tomato", "Maharashtra"),
+    ("Wheat", "Punjab"),
+    ("gehun", "punjab"),
+    ("टमाटर", "महाराष्ट्र"),
+    ("onion", "UP"),
+    ("soyabean", ""),
+    ("dragonfruit", ""),
+]
+SCHEME_QUERIES = [
+    "money directly in bank account for small farmers",
+    "crop insurance for flood damage",
+    "किसान क्रेडिट कार्ड",
+]
+
+
+def bench_prices(repeat: int, records: int) -> dict:
+    from models.market_price import DataGovScraper
+    from models.price_store import PriceStore
+
+    with tempfile.TemporaryDirectory() as folder:
+        store = PriceStore(os.path.join(folder, "prices.db"))
+        store.upsert(generate_records(records))
+        scraper = DataGovScraper(store=store)
+        results = {"records": records}
+        for crop, location in PRICE_QUERIES:
+            results[f"{crop}|{location}"] = measure(lambda: scraper.get_market_price(crop, location), repeat)
+        return results
+
+
+def bench_schemes(repeat: int) -> dict:
+    from utils.scheme_catalogue import catalogue
+    from utils.tools import Find_scheme, Scheme_detials, search_schemes
+
+    schemes = catalogue.all()
+    results = {"schemes": len(schemes), "Find_scheme": measure(lambda: Find_scheme.invoke({}), repeat)}
+    for query in SCHEME_QUERIES:
+        results[f"search_schemes|{query}"] = measure(lambda: search_schemes.invoke({"query": query}), repeat)
+    if schemes:
+        link = schemes[len(schemes) // 2].link
+        results["Scheme_detials"] = measure(lambda: Scheme_detials.invoke({"correct_link": link}), repeat)
+        results["Scheme_detials|miss"] = measure(
+            lambda: Scheme_detials.invoke({"correct_link": "https://example.org/none"}), repeat)
+    return results
+
+
+def sample_images(count: int, size=(640, 480)) -> list:
+    """Random-noise JPEG bytes, the size of a phone photo after WhatsApp compression"""
+    from PIL import Image
+
+    images = []
+    for _ in range(count):
+        buffer = io.BytesIO()
+        Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3)).save(buffer, format="JPEG", quality=85)
+        images.append(buffer.getvalue())
+    return images
+
+
+def _plant_model():
+    import torch.nn as nn
+    from torchvision import models as tv_models
+
+    from models.Disease_detect import load_model, model_path
+    from models.labels import classes
+
+    if model_path and os.path.exists(model_path):
+        return load_model(model_path, num_classes=len(classes), device="cpu")
+    model = tv_models.resnet50()
+    model.fc = nn.Linear(model.fc.in_features, len(classes))
+    return model.eval()
+
+
+def _wheat_model():
+    from models.labels import class_names
+    from models.predict_wheat_disease import ResNet50V2, load_model_wheat, wheat_model_path
+
+    if wheat_model_path and os.path.exists(wheat_model_path):
+        return load_model_wheat(wheat_model_path, num_classes=len(class_names), device="cpu")
+    return ResNet50V2(num_classes=len(class_names)).eval()
+
+
+def bench_inference(repeat: int, batch_size: int, threads: int = None) -> dict:
+    import torch
+
+    from models.Disease_detect import predict_image, predict_images
+    from models.labels import class_names
+    from models.predict_wheat_disease import predict_image_wheat, predict_images_wheat
+
+    if threads:
+        torch.set_num_threads(threads)
+    plant, wheat = _plant_model(), _wheat_model()
+    images = sample_images(batch_size)
+    repeat = max(1, repeat // 10)  # a ResNet-50 forward pass is ~100x a lookup
+    return {
+        "torch_threads": torch.get_num_threads(),
+        "batch_size": batch_size,
+        "predict_image": measure(lambda: predict_image(plant, images[0], device="cpu"), repeat),
+        "predict_image_wheat": measure(lambda: predict_image_wheat(images[0], wheat, class_names, "cpu"), repeat),
+        "predict_images": measure(lambda: predict_images(plant, images, device="cpu"), repeat, warmup=1),
+        "predict_images_wheat": measure(
+            lambda: predict_images_wheat(images, wheat, class_names, "cpu"), repeat, warmup=1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", default="prices,schemes,inference")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--records", type=int, default=50000, help="rows in the price store")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--threads", type=int, help="torch intra-op threads for inference")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    # The tools module builds ChatGroq at import; it must never reach the real API
+    configure({"GROQ_API_KEY": "fake", "GROQ_BASE_URL": "http://127.0.0.1:9", "RESPONSE_CACHE_SIZE": "0"})
+    sections = {name.strip() for name in args.only.split(",")}
+    report = {"benchmark": "micro", "repeat": args.repeat}
+    if "prices" in sections:
+        report["prices"] = bench_prices(args.repeat, args.records)
+    if "schemes" in sections:
+        report["schemes"] = bench_schemes(args.repeat)
+    if "inference" in sections:
+        report["inference"] = bench_inference(args.repeat, args.batch_size, args.threads)
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
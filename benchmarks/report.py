@@ -0,0 +1,66 @@
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+
+
+def configure(env: dict):
+    """Set the environment for the pipeline; must run before main/utils/models are imported"""
+    for key, value in env.items():
+        os.environ[key] = str(value)
+    # Nothing should outlive the run or reach the network in the background
+    os.environ.setdefault("PRICE_SYNC_INTERVAL", "0")
+    os.environ.setdefault("TTS_PREWARM", "0")
+
+
+def percentile(sorted_samples: list, q: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    # Nearest-rank, so p99 of a short run is a real observed latency
+    index = min(len(sorted_samples) - 1, max(0, math.ceil(q / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def summarise(samples: list) -> dict:
+    """Latency summary in milliseconds from samples in seconds"""
+    ordered = sorted(s * 1000 for s in samples)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def measure(fn, repeat: int, warmup: int = 3) -> dict:
+    """Call ``fn`` ``repeat`` times after a few untimed calls and summarise the latencies"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarise(samples)
+
+
+def write_report(report: dict, path: str = None):
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **report,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
@@ -1,18 +1,27 @@
-from models import speech_to_text, text_to_speech
-from utils import Base_llm, generate_1_res_prompt,tools
-from langgraph.prebuilt import ToolNode, tools_condition
+from models import http_client
+from models.admission import Overloaded, limiters, request_deadline
+from models.tracing import record_cache, record_llm, span, traced
+from utils import Base_llm, generate_1_res_prompt,tool_system_prompt,tools,response_cache,history_fingerprint,run_tool_calls,arun_tool_calls,memory,ResponseFieldExtractor
+from langgraph.prebuilt import tools_condition
 from langchain_core.tools import tool
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, SystemMessage
 from langgraph.graph import StateGraph, START, END
+from langgraph.config import get_stream_writer
 from typing import TypedDict, List
+import asyncio
 import json
+import os
 import re
 
 Audio_file = "Farmer_question1.mp3"
 
 llm_with_tools = Base_llm.bind_tools(tools)
 
-conversation_memory = []
+# Let the tool-bound call answer no-tool turns directly (one LLM round-trip instead of two)
+SINGLE_CALL_ANSWERS = os.getenv("SINGLE_CALL_ANSWERS", "1").lower() in ("1", "true", "yes")
+
+EXAMPLE_TRANSCRIPT = "I have a small piece of land in my name, but I often struggle to arrange money for seeds and fertilizers before every season. Is there any government scheme that can give me some regular financial support directly into my bank account?"
 
 # -------------------------------
 # State
@@ -22,114 +31,242 @@ class State(TypedDict):
     language: str       
     messages: List
     response: str
+    failed: bool
+    stream: bool         # forward answer tokens to the graph's custom stream (astream_response)
+    cache_context: str   # fingerprint of the history the turn started from (response cache key)
+
+def parse_response(resp_text: str):
+    """Pull the "response" field out of the model's JSON answer, None if there is none"""
+    try:
+        parsed = json.loads(resp_text)
+        if isinstance(parsed, dict) and "response" in parsed:
+            return parsed["response"]
+    except json.JSONDecodeError:
+        pass
+    # Truncated or trailing-garbage JSON: decode the field the way the stream does
+    extractor = ResponseFieldExtractor()
+    text = extractor.feed(resp_text)
+    if extractor.state in ("string", "done"):
+        return text
+    # Extract JSON with regex
+    json_match = re.search(r'\{.*"response"\s*:\s*"([^"]*)".*\}', resp_text, re.DOTALL)
+    if json_match:
+        return json_match.group(1)
+    return None
+
+def content_text(response) -> str:
+    return response.content if hasattr(response, "content") else str(response)
+
+def call_llm(llm, messages: list, stage: str):
+    # One Groq slot per call, not per turn: tools and model inference run outside it
+    with span(f"llm.{stage}"), limiters["groq"].sync_slot(request_deadline.get()):
+        with http_client.guarded("groq"):
+            response = llm.invoke(messages)
+        record_llm(stage, messages, response)
+    return response
+
+async def acall_llm(llm, messages: list, stage: str, stream: bool = False):
+    with span(f"llm.{stage}"):
+        async with limiters["groq"].slot(request_deadline.get()):
+            with http_client.guarded("groq"):
+                response = await (stream_llm(llm, messages, plain_text=stage != "tools") if stream
+                                  else llm.ainvoke(messages))
+        record_llm(stage, messages, response)
+    return response
+
+class PartialStream(Exception):
+    """A streamed call failed after part of its answer already reached the client"""
+
+async def stream_llm(llm, messages: list, plain_text: bool = True):
+    """astream the call, writing the answer's "response" text to the graph stream as it arrives"""
+    writer = get_stream_writer()
+    extractor = ResponseFieldExtractor(plain_text=plain_text)
+    response = None
+    emitted = False
+    try:
+        async for chunk in llm.astream(messages):
+            # Chunks add up to the full message, tool calls included
+            response = chunk if response is None else response + chunk
+            delta = extractor.feed(content_text(chunk))
+            if delta:
+                writer({"delta": delta})
+                emitted = True
+    except Exception as e:
+        if emitted:
+            # A fallback answer would be streamed after the half that was sent
+            raise PartialStream(str(e)) from e
+        raise
+    return response
 
 # -------------------------------
 # Nodes
 # -------------------------------
-def chat_node(state: State) -> State:
-    """Initial processing node - decides whether to use tools or respond directly"""
+# The LLM nodes are written once as generators that yield
+# (llm, messages, stage, stream) and are sent the response back (or have the
+# error thrown in). run_steps drives them for chatbot.invoke, arun_steps for
+# chatbot.ainvoke/astream (used by server.py).
+def run_steps(steps):
+    try:
+        call = next(steps)
+        while True:
+            llm, messages, stage, _ = call
+            try:
+                response = call_llm(llm, messages, stage)
+            except Exception as e:
+                call = steps.throw(e)
+            else:
+                call = steps.send(response)
+    except StopIteration as done:
+        return done.value
+
+async def arun_steps(steps):
+    try:
+        call = next(steps)
+        while True:
+            llm, messages, stage, stream = call
+            try:
+                response = await acall_llm(llm, messages, stage, stream=stream)
+            except Exception as e:
+                call = steps.throw(e)
+            else:
+                call = steps.send(response)
+    except StopIteration as done:
+        return done.value
+
+def start_turn(state: State):
+    # Start the turn with the farmer's question (messages may hold earlier turns)
+    state["messages"] = list(state.get("messages") or []) + [HumanMessage(content=state["transcript"])]
+
+def tool_call_messages(state: State) -> list:
+    messages = state["messages"]
+    if SINGLE_CALL_ANSWERS:
+        system = SystemMessage(content=tool_system_prompt.format(language=state["language"]))
+        messages = [system] + messages
+    return messages
+
+def direct_prompt(state: State, transcript: str = None) -> list:
+    formatted_prompt = generate_1_res_prompt.format(
+        transcript=transcript or state["transcript"],
+        language=state["language"]
+    )
+    return [HumanMessage(content=formatted_prompt)]
+
+def chat_failed(state: State, e: Exception) -> State:
+    print(f"Error in chat_node: {e}")
+    state["failed"] = True
+    fallback = "मुझे खुशी होगी आपकी मदद करने में।" if state["language"] == "hindi" else "I'd be happy to help you with farming questions."
+    state["response"] = fallback
+    return state
+
+def chat_steps(state: State):
+    """Initial processing - decides whether to use tools or respond directly"""
+    stream = bool(state.get("stream"))
     try:
-        # Initialize messages if empty
-        if not state.get("messages"):
-            state["messages"] = [HumanMessage(content=state["transcript"])]
+        start_turn(state)
         
         # Try tool-enabled LLM first
         try:
-            response = llm_with_tools.invoke(state["messages"])
+            response = yield llm_with_tools, tool_call_messages(state), "tools", stream and SINGLE_CALL_ANSWERS
             state["messages"].append(response)
             
-            # If no tool calls, generate direct response using your prompt
+            # If no tool calls, the answer either is already final or gets generated with your prompt
             if not (hasattr(response, 'tool_calls') and response.tool_calls):
-                formatted_prompt = generate_1_res_prompt.format(
-                    transcript=state["transcript"],
-                    language=state["language"]
-                )
-                
-                direct_response = Base_llm.invoke([HumanMessage(content=formatted_prompt)])
-                resp_text = direct_response.content if hasattr(direct_response, "content") else str(direct_response)
-                
-                # Parse JSON response
-                try:
-                    parsed = json.loads(resp_text)
-                    state["response"] = parsed.get("response", resp_text)
-                except json.JSONDecodeError:
-                    # Extract JSON with regex
-                    json_match = re.search(r'\{.*"response"\s*:\s*"([^"]*)".*\}', resp_text, re.DOTALL)
-                    if json_match:
-                        state["response"] = json_match.group(1)
-                    else:
-                        state["response"] = resp_text.strip()
+                if SINGLE_CALL_ANSWERS:
+                    resp_text = content_text(response)
+                    state["response"] = parse_response(resp_text) or resp_text.strip()
+                    return state
+
+                resp_text = content_text((yield Base_llm, direct_prompt(state), "answer", stream))
+                state["response"] = parse_response(resp_text) or resp_text.strip()
                 
+        except (Overloaded, PartialStream):
+            raise
         except Exception as tool_error:
             print(f"Tool-enabled LLM failed: {tool_error}")
             # Fallback to direct prompt approach
-            formatted_prompt = generate_1_res_prompt.format(
-                transcript=state["transcript"],
-                language=state["language"]
-            )
-            
-            response = Base_llm.invoke([HumanMessage(content=formatted_prompt)])
-            resp_text = response.content if hasattr(response, "content") else str(response)
-            
-            try:
-                parsed = json.loads(resp_text)
-                state["response"] = parsed.get("response", resp_text)
-            except:
-                state["response"] = resp_text
+            response = yield Base_llm, direct_prompt(state), "fallback", stream
+            resp_text = content_text(response)
+            state["response"] = parse_response(resp_text) or resp_text
                 
             state["messages"] = [HumanMessage(content=state["transcript"]), response]
         
+    except (Overloaded, PartialStream):
+        # Shed by admission control: the caller answers 503/504 instead of a canned reply.
+        # A broken stream can't be answered again either, the client has half of it
+        raise
     except Exception as e:
-        print(f"Error in chat_node: {e}")
-        fallback = "मुझे खुशी होगी आपकी मदद करने में।" if state["language"] == "hindi" else "I'd be happy to help you with farming questions."
-        state["response"] = fallback
+        return chat_failed(state, e)
     
     return state
 
-def process_tool_results(state: State) -> State:
+@traced("node.chat")
+def chat_node(state: State) -> State:
+    return run_steps(chat_steps(state))
+
+@traced("node.chat")
+async def achat_node(state: State) -> State:
+    return await arun_steps(chat_steps(state))
+
+def turn_tool_results(state: State) -> list:
+    # Collect tool results of the current turn
+    tool_results = []
+    for msg in reversed(state["messages"]):
+        if isinstance(msg, HumanMessage):
+            break
+        if isinstance(msg, ToolMessage):
+            tool_results.insert(0, msg.content)
+    return tool_results
+
+def enhanced_prompt(state: State, tool_results: list) -> list:
+    # Combine transcript with tool data and use your prompt template
+    enhanced_transcript = f"{state['transcript']}\n\nAdditional information: {' | '.join(tool_results)}"
+    return direct_prompt(state, enhanced_transcript)
+
+def tool_results_failed(state: State, e: Exception) -> State:
+    print(f"Error processing tool results: {e}")
+    state["failed"] = True
+    state["response"] = "I found some information but had trouble formatting it."
+    return state
+
+def tool_result_steps(state: State):
     """Process tool results and generate final response using your prompt"""
     try:
-        # Collect tool results
-        tool_results = []
-        for msg in state["messages"]:
-            if isinstance(msg, ToolMessage):
-                tool_results.append(msg.content)
-        
+        tool_results = turn_tool_results(state)
         if tool_results:
-            # Combine transcript with tool data
-            enhanced_transcript = f"{state['transcript']}\n\nAdditional information: {' | '.join(tool_results)}"
-            
-            # Use your prompt template with enhanced context
-            formatted_prompt = generate_1_res_prompt.format(
-                transcript=enhanced_transcript,
-                language=state["language"]
-            )
-            
-            response = Base_llm.invoke([HumanMessage(content=formatted_prompt)])
-            resp_text = response.content if hasattr(response, "content") else str(response)
-            
-            # Parse JSON response
-            try:
-                parsed = json.loads(resp_text)
-                state["response"] = parsed.get("response", resp_text)
-            except json.JSONDecodeError:
-                json_match = re.search(r'\{.*"response"\s*:\s*"([^"]*)".*\}', resp_text, re.DOTALL)
-                if json_match:
-                    state["response"] = json_match.group(1)
-                else:
-                    state["response"] = " | ".join(tool_results)  # Fallback to raw tool results
+            response = yield Base_llm, enhanced_prompt(state, tool_results), "tool_answer", bool(state.get("stream"))
+            # Parse JSON response, falling back to raw tool results
+            state["response"] = parse_response(content_text(response)) or " | ".join(tool_results)
             
             # Add final response to messages
             state["messages"].append(AIMessage(content=state["response"]))
-        
+    except (Overloaded, PartialStream):
+        raise
     except Exception as e:
-        print(f"Error processing tool results: {e}")
-        state["response"] = "I found some information but had trouble formatting it."
+        return tool_results_failed(state, e)
     
     return state
 
-# Tool node
-toolnode = ToolNode(tools)
+@traced("node.process_results")
+def process_tool_results(state: State) -> State:
+    return run_steps(tool_result_steps(state))
+
+@traced("node.process_results")
+async def aprocess_tool_results(state: State) -> State:
+    return await arun_steps(tool_result_steps(state))
+
+@traced("node.tools")
+def tool_node(state: State) -> State:
+    """Run every tool call of the last AI message concurrently"""
+    last_message = state["messages"][-1]
+    state["messages"].extend(run_tool_calls(last_message.tool_calls, tools))
+    return state
+
+@traced("node.tools")
+async def atool_node(state: State) -> State:
+    """Async tool_node"""
+    last_message = state["messages"][-1]
+    state["messages"].extend(await arun_tool_calls(last_message.tool_calls, tools))
+    return state
 
 # -------------------------------
 # Conditional Logic
@@ -158,9 +295,9 @@ def should_continue(state: State) -> str:
 # Graph with Tools
 # -------------------------------
 graph = StateGraph(State)
-graph.add_node("chat", chat_node)
-graph.add_node("tools", toolnode)
-graph.add_node("process_results", process_tool_results)
+graph.add_node("chat", RunnableLambda(chat_node, afunc=achat_node))
+graph.add_node("tools", RunnableLambda(tool_node, afunc=atool_node))
+graph.add_node("process_results", RunnableLambda(process_tool_results, afunc=aprocess_tool_results))
 
 # Edges
 graph.add_edge(START, "chat")
@@ -173,27 +310,46 @@ chatbot = graph.compile()
 # -------------------------------
 # Run pipeline
 # -------------------------------
-def get_response():
-    # Document = speech_to_text(Audio_file)
-    # state = {
-    #     "transcript": Document.page_content,
-    #     "language":Document.metadata['language'],
-    #     "response": "",
-    #     "messages": conversation_memory.copy()
-    # }
-    state = {
-        "transcript":"I have a small piece of land in my name, but I often struggle to arrange money for seeds and fertilizers before every season. Is there any government scheme that can give me some regular financial support directly into my bank account?",
-        "language":"English",
+def new_state(transcript: str, language: str, session_id: str) -> State:
+    messages = memory.history(session_id)
+    return {
+        "transcript": transcript,
+        "language": language,
         "response": "",
-        "messages": conversation_memory.copy()
+        "messages": messages,
+        "cache_context": history_fingerprint(messages),
     }
+
+def cached_answer(state: State, session_id: str):
+    cached = response_cache.get(state["transcript"], state["language"], state["cache_context"])
+    record_cache("response", cached is not None)
+    if cached is not None:
+        print("Answer served from response cache")
+        memory.append_turn(session_id, state["transcript"], cached)
+    return cached
+
+def finish_turn(state: State, final_state: State, session_id: str) -> str:
+    answer = final_state.get("response", "No response generated")
+    memory.append_turn(session_id, state["transcript"], answer)
+    if not final_state.get("failed"):
+        tools_used = [msg.name for msg in final_state["messages"] if isinstance(msg, ToolMessage)]
+        response_cache.put(state["transcript"], state["language"], answer, tools_used, state["cache_context"])
+    return answer
+
+@traced("turn")
+def get_response(transcript: str = EXAMPLE_TRANSCRIPT, language: str = "English", session_id: str = "default"):
+    # Document = speech_to_text(Audio_file)
+    # transcript, language = Document.page_content, Document.metadata['language']
+    state = new_state(transcript, language, session_id)
     
+    cached = cached_answer(state, session_id)
+    if cached is not None:
+        return cached
+
     try:
         print(f"🤔 Processing: {state['transcript']}")
         final_state = chatbot.invoke(state)
-        answer = final_state.get("response", "No response generated")
-        conversation_memory[:] = final_state['messages']
-        # print(conversation_memory[:])
+        answer = finish_turn(state, final_state, session_id)
         # audio = text_to_speech(answer)
         # if audio:
         #     with open("response231311rsdgfhjk.mp3", "wb") as f:
@@ -208,6 +364,52 @@ def get_response():
         traceback.print_exc()
         return "Error processing request"
 
+@traced("turn")
+async def aget_response(transcript: str, language: str = "English", session_id: str = "default") -> str:
+    """Async get_response used by the HTTP service; errors propagate to the caller"""
+    # Session memory may be SQLite, so it stays off the event loop
+    state = await asyncio.to_thread(new_state, transcript, language, session_id)
+    
+    cached = await asyncio.to_thread(cached_answer, state, session_id)
+    if cached is not None:
+        return cached
+
+    final_state = await chatbot.ainvoke(state)
+    return await asyncio.to_thread(finish_turn, state, final_state, session_id)
+
+@traced("turn")
+async def astream_response(transcript: str, language: str = "English", session_id: str = "default"):
+    """Async iterator of answer text deltas, saved to memory and cache like aget_response.
+
+    Raises PartialStream if the model fails partway through the answer.
+    """
+    state = await asyncio.to_thread(new_state, transcript, language, session_id)
+    state["stream"] = True
+
+    cached = await asyncio.to_thread(cached_answer, state, session_id)
+    if cached is not None:
+        yield cached
+        return
+
+    emitted = ""
+    final_state = state
+    async for mode, chunk in chatbot.astream(state, stream_mode=["custom", "values"]):
+        if mode == "custom":
+            emitted += chunk["delta"]
+            yield chunk["delta"]
+        else:
+            final_state = chunk
+    answer = await asyncio.to_thread(finish_turn, state, final_state, session_id)
+
+    # Fallback answers (errors, unparsable output) never went through the stream
+    if not emitted:
+        yield answer
+    elif answer.startswith(emitted):
+        if answer != emitted:
+            yield answer[len(emitted):]
+    else:
+        print("Streamed answer differs from the final one")
+
 if __name__ == "__main__":
 
     get_response()
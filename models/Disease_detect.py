@@ -3,7 +3,9 @@ import os
 import torch
 import torch.nn as nn
 from torchvision import models, transforms
-from PIL import Image
+
+from .image_io import load_batch, local_file, open_image, top_k_predictions
+from .labels import classes
 
 
 def load_model(model_path, num_classes=38, device="cuda:0"):
@@ -18,37 +20,18 @@ def load_model(model_path, num_classes=38, device="cuda:0"):
     return model
 
 
-classes = [
-    'Apple___Apple_scab', 'Apple___Black_rot', 'Apple___Cedar_apple_rust',
-    'Apple___healthy', 'Blueberry___healthy', 'Cherry___Powdery_mildew',
-    'Cherry___healthy', 'Corn___Cercospora_leaf_spot Gray_leaf_spot',
-    'Corn___Common_rust', 'Corn___Northern_Leaf_Blight', 'Corn___healthy',
-    'Grape___Black_rot', 'Grape___Esca_(Black_Measles)',
-    'Grape___Leaf_blight_(Isariopsis_Leaf_Spot)', 'Grape___healthy',
-    'Orange___Haunglongbing_(Citrus_greening)', 'Peach___Bacterial_spot',
-    'Peach___healthy', 'Pepper,_bell___Bacterial_spot', 'Pepper,_bell___healthy',
-    'Potato___Early_blight', 'Potato___Late_blight', 'Potato___healthy',
-    'Raspberry___healthy', 'Soybean___healthy', 'Squash___Powdery_mildew',
-    'Strawberry___Leaf_scorch', 'Strawberry___healthy',
-    'Tomato___Bacterial_spot', 'Tomato___Early_blight',
-    'Tomato___Late_blight', 'Tomato___Leaf_Mold', 'Tomato___Septoria_leaf_spot',
-    'Tomato___Spider_mites Two-spotted_spider_mite', 'Tomato___Target_Spot',
-    'Tomato___Tomato_Yellow_Leaf_Curl_Virus', 'Tomato___Tomato_mosaic_virus',
-    'Tomato___healthy'
-]
+PLANT_TRANSFORM = transforms.Compose([
+    transforms.Resize(256),
+    transforms.CenterCrop(224),
+    transforms.ToTensor(),
+    transforms.Normalize([0.485, 0.456, 0.406],
+                         [0.229, 0.224, 0.225])
+])
 
 
 def predict_image(model, image_path, device="cuda:0"):
-    transform = transforms.Compose([
-        transforms.Resize(256),
-        transforms.CenterCrop(224),
-        transforms.ToTensor(),
-        transforms.Normalize([0.485, 0.456, 0.406],
-                             [0.229, 0.224, 0.225])
-    ])
-
-    image = Image.open(image_path).convert("RGB")
-    input_tensor = transform(image).unsqueeze(0).to(device)
+    image = open_image(local_file(image_path))
+    input_tensor = PLANT_TRANSFORM(image).unsqueeze(0).to(device)
 
     with torch.no_grad():
         outputs = model(input_tensor)
@@ -57,5 +40,16 @@ def predict_image(model, image_path, device="cuda:0"):
     predicted_class = classes[preds.item()]
     return predicted_class
 
+
+def predict_images(model, images, device="cuda:0", top_k=3, batch_size=16):
+    """Classify several images (paths or bytes) with one forward pass per batch"""
+    results = []
+    for start in range(0, len(images), batch_size):
+        batch = load_batch([local_file(i) for i in images[start:start + batch_size]], PLANT_TRANSFORM).to(device)
+        with torch.no_grad():
+            outputs = model(batch)
+        results.extend(top_k_predictions(outputs, classes, top_k))
+    return results
+
 device = "cuda:0" if torch.cuda.is_available() else "cpu"
 model_path = os.getenv("MODEL_PATH") 
\ No newline at end of file
@@ -1,28 +1,123 @@
 import os
 import json
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
 from langchain.schema import Document
-from groq import Groq
+from groq import AsyncGroq
+
+from . import http_client
+from .admission import limiters, request_deadline
+from .tracing import traced
+from .vad import load_audio, split_speech, to_flac
 
 load_dotenv()
-os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
-groq_client = Groq()
+STT_CHUNK_CONCURRENCY = int(os.getenv("STT_CHUNK_CONCURRENCY", "4"))
 # audio_file_path = "farmer_response.mp3"
 
-def transcribe_multilingual(file_path: str, model="whisper-large-v3"):
-    with open(file_path, "rb") as f:
-        resp = groq_client.audio.transcriptions.create(
+def transcribe_multilingual(audio, model="whisper-large-v3", filename="audio.mp3"):
+    """Transcribe a file path or in-memory audio bytes"""
+    if isinstance(audio, (bytes, bytearray)):
+        with limiters["groq"].sync_slot(request_deadline.get()), http_client.guarded("groq"):
+            return http_client.groq_client().audio.transcriptions.create(
+                file=(filename, bytes(audio)),
+                model=model,
+                response_format="verbose_json",
+            )
+    with limiters["groq"].sync_slot(request_deadline.get()), http_client.guarded("groq"), open(audio, "rb") as f:
+        resp = http_client.groq_client().audio.transcriptions.create(
             file=f,
             model=model,
             response_format="verbose_json",
         )
     return resp
 
-def speech_to_text(audio_file:str):
-    resp = transcribe_multilingual(audio_file)
+@traced("stt")
+def speech_to_text(audio_file, filename="audio.mp3"):
+    resp = transcribe_multilingual(audio_file, filename=filename)
     doc = Document(
         page_content=resp.text,
         metadata={"language": resp.language, "source": "audio"}
     )
     return doc
+
+
+def get_async_client() -> AsyncGroq:
+    return http_client.groq_client(asynchronous=True)
+
+
+async def atranscribe_multilingual(audio: bytes, filename: str = "audio.mp3", model="whisper-large-v3"):
+    # One Groq slot per request, so every parallel chunk counts against the limiter
+    async with limiters["groq"].slot(request_deadline.get()):
+        with http_client.guarded("groq"):
+            return await get_async_client().audio.transcriptions.create(
+                file=(filename, audio),
+                model=model,
+                response_format="verbose_json",
+            )
+
+
+@traced("stt")
+async def aspeech_to_text(audio: bytes, filename: str = "audio.mp3"):
+    resp = await atranscribe_multilingual(audio, filename)
+    return Document(
+        page_content=resp.text,
+        metadata={"language": resp.language, "source": "audio"}
+    )
+
+
+def _stitch(responses, durations, chunks):
+    text = " ".join(r.text.strip() for r in responses if r.text and r.text.strip())
+    # Whisper guesses the language per chunk; the one covering most of the speech wins
+    votes = Counter()
+    for resp, duration in zip(responses, durations):
+        votes[resp.language] += duration
+    language = votes.most_common(1)[0][0]
+    return Document(
+        page_content=text,
+        metadata={"language": language, "source": "audio", "chunks": chunks, "speech_ms": sum(durations)}
+    )
+
+
+def _speech_chunks(audio):
+    try:
+        segments = split_speech(load_audio(audio))
+        return [to_flac(segment) for segment in segments], [len(segment) for segment in segments]
+    except Exception as e:
+        # No ffmpeg/ffprobe, or a format pydub can't decode: Whisper may still read it
+        print(f"❌ Couldn't split the voice note, transcribing it whole: {e}")
+        return [], []
+
+
+@traced("stt.chunked")
+def speech_to_text_chunked(audio, filename="audio.mp3"):
+    """speech_to_text for long voice notes: pauses trimmed, chunks transcribed in parallel.
+
+    ``audio`` may be a path or raw bytes. If no speech is detected, or the
+    audio can't be decoded here, the whole recording is sent as is, so a
+    quiet note still gets a transcript.
+    """
+    chunks, durations = _speech_chunks(audio)
+    if not chunks:
+        return speech_to_text(audio, filename)
+    with ThreadPoolExecutor(max_workers=min(len(chunks), STT_CHUNK_CONCURRENCY)) as pool:
+        responses = list(pool.map(lambda chunk: transcribe_multilingual(chunk, filename="chunk.flac"), chunks))
+    return _stitch(responses, durations, len(chunks))
+
+
+@traced("stt.chunked")
+async def aspeech_to_text_chunked(audio: bytes, filename: str = "audio.mp3"):
+    """Async speech_to_text_chunked; decoding and VAD run in a worker thread"""
+    chunks, durations = await asyncio.to_thread(_speech_chunks, audio)
+    if not chunks:
+        return await aspeech_to_text(audio, filename)
+    semaphore = asyncio.Semaphore(STT_CHUNK_CONCURRENCY)
+
+    async def transcribe(chunk):
+        async with semaphore:
+            return await atranscribe_multilingual(chunk, "chunk.flac")
+
+    responses = await asyncio.gather(*(transcribe(chunk) for chunk in chunks))
+    return _stitch(responses, durations, len(chunks))
@@ -1,5 +1,54 @@
-from .Stt import speech_to_text
-from .tts import text_to_speech
-from .market_price import DataGovScraper
-from .Disease_detect import load_model,predict_image,device,model_path,classes
-from .predict_wheat_disease import load_model_wheat,predict_image_wheat,class_names,wheat_model_path
\ No newline at end of file
+"""Everything is resolved on first attribute access (PEP 562).
+
+``from models import DataGovScraper`` only imports models.market_price, so a
+worker that never runs disease detection never imports torch.
+"""
+import importlib
+
+_EXPORTS = {
+    "speech_to_text": (".Stt", "speech_to_text"),
+    "aspeech_to_text": (".Stt", "aspeech_to_text"),
+    "speech_to_text_chunked": (".Stt", "speech_to_text_chunked"),
+    "aspeech_to_text_chunked": (".Stt", "aspeech_to_text_chunked"),
+    "text_to_speech": (".tts", "text_to_speech"),
+    "atext_to_speech": (".tts", "atext_to_speech"),
+    "text_to_speech_stream": (".tts", "text_to_speech_stream"),
+    "atext_to_speech_stream": (".tts", "atext_to_speech_stream"),
+    "prewarm_tts": (".tts", "prewarm"),
+    "audio_cache": (".tts_cache", "audio_cache"),
+    "DataGovScraper": (".market_price", "DataGovScraper"),
+    "load_model": (".Disease_detect", "load_model"),
+    "predict_image": (".Disease_detect", "predict_image"),
+    "predict_images": (".Disease_detect", "predict_images"),
+    "device": (".Disease_detect", "device"),
+    "model_path": (".Disease_detect", "model_path"),
+    "classes": (".labels", "classes"),
+    "load_model_wheat": (".predict_wheat_disease", "load_model_wheat"),
+    "predict_image_wheat": (".predict_wheat_disease", "predict_image_wheat"),
+    "predict_images_wheat": (".predict_wheat_disease", "predict_images_wheat"),
+    "class_names": (".labels", "class_names"),
+    "wheat_model_path": (".predict_wheat_disease", "wheat_model_path"),
+    "registry": (".model_registry", "registry"),
+    "register_upload": (".image_io", "register_upload"),
+    "detect_disease": (".disease_router", "detect_disease"),
+    "inference_pool": (".inference_workers", "inference_pool"),
+    "limiters": (".admission", "limiters"),
+    "Overloaded": (".admission", "Overloaded"),
+    "DeadlineExceeded": (".admission", "DeadlineExceeded"),
+    "request_deadline": (".admission", "request_deadline"),
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attr = _EXPORTS[name]
+    value = getattr(importlib.import_module(module, __name__), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,140 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of queued for an upstream"""
+
+    def __init__(self, upstream: str, reason: str):
+        super().__init__(f"{upstream} is overloaded: {reason}")
+        self.upstream = upstream
+        self.reason = reason
+
+
+class DeadlineExceeded(Overloaded):
+    """The request's deadline passed before a slot was free (504 rather than 503)"""
+
+
+# Deadline of the request being served, read by call sites deep in the pipeline
+# (the LLM calls) that take a limiter slot; None means no deadline
+request_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+class Limiter:
+    """Bounded concurrency for one upstream with a bounded wait queue.
+
+    At most ``max_concurrency`` calls run at once; up to ``max_queue`` more
+    may wait, each for at most ``timeout`` seconds (or until the caller's
+    deadline). Anything beyond that is shed with ``Overloaded`` so the
+    service answers 503 quickly instead of piling up work it cannot finish.
+    Async callers and threads get separate semaphores of the same size.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, timeout: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.waiting = 0
+        self.in_flight = 0
+        self.shed = 0
+        self._async_sem = None
+        self._sync_sem = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+
+    def _wait_budget(self, deadline: float = None) -> float:
+        budget = self.timeout
+        if deadline is not None:
+            budget = min(budget, deadline - time.monotonic())
+        if budget <= 0:
+            with self._lock:
+                self.shed += 1
+            raise DeadlineExceeded(self.name, "deadline already passed")
+        return budget
+
+    def _enqueue(self):
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                self.shed += 1
+                raise Overloaded(self.name, f"{self.waiting} requests already queued")
+            self.waiting += 1
+
+    def _reject(self, reason: str):
+        with self._lock:
+            self.shed += 1
+        raise Overloaded(self.name, reason)
+
+    def _started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def _finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, deadline: float = None):
+        """``async with limiter.slot(deadline):`` around one upstream call"""
+        if self._async_sem is None:
+            self._async_sem = asyncio.Semaphore(self.max_concurrency)
+        budget = self._wait_budget(deadline)
+        self._enqueue()
+        try:
+            await asyncio.wait_for(self._async_sem.acquire(), budget)
+        except asyncio.TimeoutError:
+            self._reject(f"no slot within {budget:.1f}s")
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        self._started()
+        try:
+            yield
+        finally:
+            self._finished()
+            self._async_sem.release()
+
+    @contextmanager
+    def sync_slot(self, deadline: float = None):
+        """Thread counterpart of ``slot`` for blocking clients"""
+        budget = self._wait_budget(deadline)
+        self._enqueue()
+        try:
+            acquired = self._sync_sem.acquire(timeout=budget)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        if not acquired:
+            self._reject(f"no slot within {budget:.1f}s")
+
+        self._started()
+        try:
+            yield
+        finally:
+            self._finished()
+            self._sync_sem.release()
+
+    def stats(self) -> dict:
+        return {"in_flight": self.in_flight, "waiting": self.waiting, "shed": self.shed,
+                "max_concurrency": self.max_concurrency, "max_queue": self.max_queue}
+
+
+def _limiter(name: str, concurrency: int, queue: int, timeout: float) -> Limiter:
+    prefix = f"{name.upper()}_"
+    return Limiter(
+        name,
+        max_concurrency=int(os.getenv(prefix + "MAX_CONCURRENCY", str(concurrency))),
+        max_queue=int(os.getenv(prefix + "MAX_QUEUE", str(queue))),
+        timeout=float(os.getenv(prefix + "QUEUE_TIMEOUT", str(timeout))),
+    )
+
+
+limiters = {
+    "groq": _limiter("groq", 32, 256, 10),
+    "elevenlabs": _limiter("elevenlabs", 8, 128, 10),
+    "datagov": _limiter("datagov", 4, 16, 30),
+}
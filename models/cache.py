@@ -0,0 +1,173 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and optional SQLite persistence.
+
+    Values must be JSON serialisable when ``path`` is given, since the disk
+    tier outlives the process.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600, path: str = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires REAL, value TEXT)"
+                )
+                self._db.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+
+    def get(self, key, default=None):
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def peek(self, key, default=None):
+        """Like ``get`` but left out of the hit/miss counts, for callers keeping their own"""
+        with self._lock:
+            found, value = self._lookup(key)
+            return value if found else default
+
+    def set(self, key, value, ttl: float = None):
+        """Store a value; ``ttl`` overrides the cache default (None keeps it, 0 means no expiry)"""
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            self._evict()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO cache (key, expires, value) VALUES (?, ?, ?)",
+                        (key, expires, json.dumps(value, ensure_ascii=False)),
+                    )
+
+    def delete(self, key):
+        with self._lock:
+            self._delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM cache")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
+
+    def __len__(self):
+        return len(self._data)
+
+    # Callers hold self._lock for everything below
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is None and self._db is not None:
+            entry = self._load(key)
+        if entry is not None:
+            expires, value = entry
+            if expires is None or expires > time.time():
+                self._data[key] = entry
+                self._data.move_to_end(key)
+                self._evict()
+                return True, value
+            self._delete(key)
+        return False, None
+
+    def _evict(self):
+        # Memory tier only; evicted entries stay on disk until they expire
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def _delete(self, key):
+        self._data.pop(key, None)
+        if self._db is not None:
+            with self._db:
+                self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def _load(self, key):
+        row = self._db.execute("SELECT expires, value FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response rebuilt from a cached JSON body"""
+
+    def __init__(self, payload, status_code: int = 200):
+        self._payload = payload
+        self.status_code = status_code
+        self.ok = 200 <= status_code < 400
+        self.from_cache = True
+
+    def json(self):
+        return self._payload
+
+    @property
+    def text(self):
+        return json.dumps(self._payload, ensure_ascii=False)
+
+
+class CachedSession:
+    """Wraps a requests.Session so JSON GETs are served from a TTLCache.
+
+    The key is the URL plus the sorted request parameters, with credentials
+    left out so rotating the API key does not empty the cache.
+    """
+
+    IGNORED_PARAMS = {"api-key", "api_key", "apikey"}
+
+    def __init__(self, session, cache: TTLCache):
+        self.session = session
+        self.cache = cache
+
+    def cache_key(self, url: str, params=None) -> str:
+        items = sorted(
+            (str(k).lower(), str(v).strip().lower())
+            for k, v in (params or {}).items()
+            if str(k).lower() not in self.IGNORED_PARAMS
+        )
+        return url + "?" + "&".join(f"{k}={v}" for k, v in items)
+
+    def get(self, url, params=None, use_cache: bool = True, **kwargs):
+        if not use_cache:
+            return self.session.get(url, params=params, **kwargs)
+
+        key = self.cache_key(url, params)
+        payload = self.cache.get(key)
+        if payload is not None:
+            return CachedResponse(payload)
+
+        response = self.session.get(url, params=params, **kwargs)
+        if response.status_code == 200:
+            self.cache.set(key, response.json())
+        return response
+
+    def __getattr__(self, name):
+        # headers, close(), mount() etc. go straight to the wrapped session
+        return getattr(self.session, name)
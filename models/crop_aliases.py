@@ -0,0 +1,71 @@
+import re
+
+# Farmer-facing names (English, Hinglish, Devanagari) -> commodity key used in the store.
+# Keys on the right are the Data.gov.in commodity name lowercased with any
+# bracketed qualifier removed, e.g. "Paddy(Dhan)(Common)" -> "paddy".
+COMMODITY_ALIASES = {
+    "rice": "paddy", "dhan": "paddy", "chawal": "paddy", "chaawal": "paddy",
+    "धान": "paddy", "चावल": "paddy",
+    "gehun": "wheat", "gehu": "wheat", "gehoon": "wheat", "गेहूं": "wheat", "गेहूँ": "wheat", "गेंहू": "wheat",
+    "tamatar": "tomato", "टमाटर": "tomato",
+    "pyaz": "onion", "pyaaz": "onion", "kanda": "onion", "प्याज": "onion", "प्याज़": "onion",
+    "aloo": "potato", "alu": "potato", "आलू": "potato",
+    "makka": "maize", "makki": "maize", "corn": "maize", "मक्का": "maize",
+    "kapas": "cotton", "कपास": "cotton",
+    "sarson": "mustard", "सरसों": "mustard",
+    "okra": "bhindi", "ladies finger": "bhindi", "lady finger": "bhindi", "भिंडी": "bhindi",
+    "baingan": "brinjal", "eggplant": "brinjal", "बैंगन": "brinjal",
+    "mirchi": "green chilli", "mirch": "green chilli", "chilli": "green chilli", "हरी मिर्च": "green chilli",
+    "soybean": "soyabean", "soya": "soyabean", "सोयाबीन": "soyabean",
+    "tur": "arhar", "toor": "arhar", "arhar dal": "arhar", "अरहर": "arhar",
+    "chana": "bengal gram", "gram": "bengal gram", "चना": "bengal gram",
+    "moong": "green gram", "मूंग": "green gram",
+    "urad": "black gram", "उड़द": "black gram",
+    "बाजरा": "bajra", "ज्वार": "jowar",
+    "ganna": "sugarcane", "गन्ना": "sugarcane",
+    "lehsun": "garlic", "lahsun": "garlic", "लहसुन": "garlic",
+    "adrak": "ginger", "अदरक": "ginger",
+    "gobhi": "cauliflower", "phool gobhi": "cauliflower", "फूलगोभी": "cauliflower",
+    "patta gobhi": "cabbage", "पत्तागोभी": "cabbage",
+    "kela": "banana", "केला": "banana",
+    "aam": "mango", "आम": "mango",
+    "mungfali": "groundnut", "moongphali": "groundnut", "peanut": "groundnut", "मूंगफली": "groundnut",
+}
+
+STATE_ALIASES = {
+    "up": "uttar pradesh", "u.p.": "uttar pradesh", "उत्तर प्रदेश": "uttar pradesh",
+    "mp": "madhya pradesh", "m.p.": "madhya pradesh", "मध्य प्रदेश": "madhya pradesh",
+    "hp": "himachal pradesh", "हिमाचल प्रदेश": "himachal pradesh",
+    "ap": "andhra pradesh", "आंध्र प्रदेश": "andhra pradesh",
+    "tn": "tamil nadu", "तमिलनाडु": "tamil nadu",
+    "wb": "west bengal", "bengal": "west bengal", "पश्चिम बंगाल": "west bengal",
+    "jk": "jammu and kashmir", "j&k": "jammu and kashmir",
+    "delhi": "nct of delhi", "new delhi": "nct of delhi", "दिल्ली": "nct of delhi",
+    "orissa": "odisha", "ओडिशा": "odisha",
+    "पंजाब": "punjab", "हरियाणा": "haryana", "राजस्थान": "rajasthan", "बिहार": "bihar",
+    "गुजरात": "gujarat", "महाराष्ट्र": "maharashtra", "कर्नाटक": "karnataka", "केरल": "kerala",
+    "तेलंगाना": "telangana", "उत्तराखंड": "uttarakhand", "छत्तीसगढ़": "chhattisgarh", "झारखंड": "jharkhand",
+}
+
+
+def _clean(name: str) -> str:
+    name = str(name or "").lower()
+    name = name.split("(", 1)[0]
+    name = re.sub(r"[,;:!?'\"/_-]", " ", name)
+    return re.sub(r"\s+", " ", name).strip()
+
+
+def commodity_key(name: str) -> str:
+    """Key a stored record is filed under: the cleaned Data.gov.in name, never aliased"""
+    return _clean(name)
+
+
+def normalise_commodity(name: str) -> str:
+    """Key a farmer's crop name asks for (aliases applied, query side only)"""
+    key = _clean(name)
+    return COMMODITY_ALIASES.get(key, key)
+
+
+def normalise_state(name: str) -> str:
+    key = _clean(name)
+    return STATE_ALIASES.get(key, key)
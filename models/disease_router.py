@@ -0,0 +1,77 @@
+import os
+
+import torch
+
+from .Disease_detect import PLANT_TRANSFORM, classes, device
+from .crop_aliases import normalise_commodity
+from .image_io import open_image, top_k_predictions
+from .inference_workers import inference_pool
+from .predict_wheat_disease import VAL_TEST_TRANSFORM, class_names
+from .model_registry import registry
+
+CONFIDENCE_THRESHOLD = float(os.getenv("DISEASE_CONFIDENCE_THRESHOLD", "0.6"))
+
+MODELS = {
+    "plant": (PLANT_TRANSFORM, classes),
+    "wheat": (VAL_TEST_TRANSFORM, class_names),
+}
+
+# Crops the PlantVillage model knows, as commodity keys ("Corn_(maize)___..." -> "maize")
+PLANT_CROPS = {normalise_commodity(c.split("___")[0]) for c in classes} | {"pepper", "bell pepper", "capsicum"}
+
+
+def route(crop: str = "") -> list:
+    """Model names to try, in order, for a crop hint.
+
+    A known crop runs only its own model: the 38-class and 15-class softmax
+    confidences are not comparable, so a fallback could turn a tomato leaf
+    into a wheat diagnosis. Only an empty or unknown hint tries both.
+    """
+    key = normalise_commodity(crop) if crop else ""
+    if key == "wheat":
+        return ["wheat"]
+    if key in PLANT_CROPS:
+        return ["plant"]
+    # No usable hint: the PlantVillage model covers more crops
+    return ["plant", "wheat"]
+
+
+@torch.no_grad()
+def _classify(name: str, image) -> dict:
+    transform, labels = MODELS[name]
+    tensor = transform(image).unsqueeze(0).to(device)
+    outputs = registry.get(name)(tensor)
+    if isinstance(outputs, (list, tuple)):
+        outputs = outputs[0]
+    result = top_k_predictions(outputs, labels)[0]
+    result["model"] = name
+    result["confidence"] = result["top_k"][0]["probability"]
+    return result
+
+
+def detect_disease(image, crop: str = "", threshold: float = None) -> dict:
+    """Classify a leaf photo with the model matching the crop hint.
+
+    The image is decoded once. Without a usable hint both models may run:
+    the second only when the first one's softmax confidence is below
+    ``threshold``. Its answer replaces the first one only if it clears
+    ``threshold`` itself, since confidences from different heads can't be
+    ranked against each other (see ``route``). With INFERENCE_WORKERS set
+    the models run in the inference pool's worker processes.
+    """
+    threshold = CONFIDENCE_THRESHOLD if threshold is None else threshold
+    decoded = open_image(image)
+
+    best = None
+    models_run = []
+    for name in route(crop):
+        result = inference_pool.classify(name, decoded) if inference_pool.enabled else _classify(name, decoded)
+        models_run.append(name)
+        if best is None or result["confidence"] >= threshold:
+            best = result
+        if best["confidence"] >= threshold:
+            break
+
+    best["models_run"] = models_run
+    best["low_confidence"] = best["confidence"] < threshold
+    return best
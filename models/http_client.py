@@ -0,0 +1,393 @@
+"""Shared outbound HTTP layer: one pooled client per upstream.
+
+Every upstream gets keep-alive pools sized for its traffic, explicit
+connect/read timeouts, exponential backoff with jitter, and a circuit
+breaker that fails fast (as ``CircuitOpen``, a kind of ``Overloaded``) after
+repeated failures instead of letting every request wait for its timeout.
+Idempotent requests are retried on 429/5xx and connection errors; POSTs
+(chat, STT, TTS) only when they never reached the upstream: connect errors,
+429 and 503. SDK calls go through ``guarded`` so an open breaker surfaces as
+``CircuitOpen`` rather than the SDK's connection error. Settings can be overridden
+per upstream with ``<NAME>_CONNECT_TIMEOUT``, ``_READ_TIMEOUT``,
+``_POOL_SIZE``, ``_MAX_RETRIES``, ``_BREAKER_FAILURES`` and
+``_BREAKER_RESET``.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .admission import Overloaded
+from .tracing import record_http, span
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Turned away without being processed, so even a POST is safe to repeat
+SAFE_RETRY_STATUSES = (429, 503)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+BACKOFF_FACTOR = 0.5
+BACKOFF_MAX = 8.0
+
+
+class CircuitOpen(Overloaded):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures.
+
+    While open every call is rejected; after ``reset_timeout`` seconds one
+    trial call is let through (half-open) and its outcome closes or re-opens
+    the breaker.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def check(self):
+        """Fail fast while open, without claiming the half-open trial (the transport does that)"""
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half_open" and self.trial_running):
+                raise CircuitOpen(self.name, f"circuit open after {self.failures} failures")
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpen while open; True when this call is the half-open trial"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return False
+            if state == "open" or self.trial_running:
+                raise CircuitOpen(self.name, f"circuit open after {self.failures} failures")
+            self.trial_running = True
+            return True
+
+    def abandon(self, trial: bool):
+        """A call ended without an outcome (cancelled, or an error outside the transport).
+
+        Counts as a failure only for the trial, so the breaker re-opens
+        instead of waiting on a trial that will never report back.
+        """
+        if trial:
+            self.record_failure()
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def record(self, status_code: int):
+        if status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self.failures}
+
+
+class Upstream:
+    def __init__(self, name: str, connect_timeout: float, read_timeout: float, pool_size: int,
+                 max_retries: int, breaker_failures: int = 5, breaker_reset: float = 30):
+        prefix = f"{name.upper()}_"
+        self.name = name
+        self.connect_timeout = float(os.getenv(prefix + "CONNECT_TIMEOUT", str(connect_timeout)))
+        self.read_timeout = float(os.getenv(prefix + "READ_TIMEOUT", str(read_timeout)))
+        self.pool_size = int(os.getenv(prefix + "POOL_SIZE", str(pool_size)))
+        self.max_retries = int(os.getenv(prefix + "MAX_RETRIES", str(max_retries)))
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=int(os.getenv(prefix + "BREAKER_FAILURES", str(breaker_failures))),
+            reset_timeout=float(os.getenv(prefix + "BREAKER_RESET", str(breaker_reset))),
+        )
+
+    @property
+    def timeout(self) -> tuple:
+        return (self.connect_timeout, self.read_timeout)
+
+    @property
+    def httpx_timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+    @property
+    def httpx_limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+
+
+upstreams = {
+    "groq": Upstream("groq", connect_timeout=5, read_timeout=60, pool_size=32, max_retries=2),
+    "elevenlabs": Upstream("elevenlabs", connect_timeout=5, read_timeout=30, pool_size=8, max_retries=2),
+    "datagov": Upstream("datagov", connect_timeout=5, read_timeout=15, pool_size=4, max_retries=3),
+    "myscheme": Upstream("myscheme", connect_timeout=10, read_timeout=30, pool_size=8, max_retries=3),
+}
+
+
+def should_retry(method: str, status: int = None, error: Exception = None) -> bool:
+    if method.upper() in IDEMPOTENT_METHODS:
+        return error is not None or status in RETRY_STATUSES
+    if error is not None:
+        return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+    return status in SAFE_RETRY_STATUSES
+
+
+def backoff(attempt: int, retry_after: str = None) -> float:
+    """Full-jitter exponential backoff, honouring a numeric Retry-After"""
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_FACTOR * 2 ** attempt))
+
+
+@contextmanager
+def guarded(name: str):
+    """Around an SDK call (Groq, ChatGroq) on this module's transports.
+
+    The SDKs turn any transport exception into their own connection error
+    and retry it, so the breaker is checked before the call and a wrapped
+    ``CircuitOpen`` is re-raised as itself.
+    """
+    upstreams[name].breaker.check()
+    try:
+        yield
+    except CircuitOpen:
+        raise
+    except Exception as e:
+        cause = e.__cause__ or e.__context__
+        if isinstance(cause, CircuitOpen):
+            raise cause from None
+        raise
+
+
+# -------------------------------
+# requests
+# -------------------------------
+class UpstreamRetry(Retry):
+    """urllib3 Retry that also repeats non-idempotent requests on 429/503 (read errors never)"""
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if self._is_method_retryable(method):
+            return super().is_retry(method, status_code, has_retry_after)
+        return status_code in SAFE_RETRY_STATUSES
+
+
+class UpstreamSession(requests.Session):
+    """requests.Session with default timeouts and the upstream's circuit breaker"""
+
+    def __init__(self, upstream: Upstream):
+        super().__init__()
+        self.upstream = upstream
+        retry = UpstreamRetry(
+            total=upstream.max_retries,
+            backoff_factor=BACKOFF_FACTOR,
+            backoff_jitter=BACKOFF_FACTOR,
+            backoff_max=BACKOFF_MAX,
+            status_forcelist=RETRY_STATUSES,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=upstream.pool_size, max_retries=retry)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.upstream.timeout)
+        breaker = self.upstream.breaker
+        with span(f"http.{self.upstream.name}", method=method):
+            trial = breaker.before_call()
+            try:
+                response = super().request(method, url, **kwargs)
+            except requests.RequestException:
+                breaker.record_failure()
+                record_http(self.upstream.name, "error")
+                raise
+            except BaseException:
+                breaker.abandon(trial)
+                raise
+            breaker.record(response.status_code)
+            record_http(self.upstream.name, response.status_code)
+            return response
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def session(name: str) -> UpstreamSession:
+    """The process-wide requests session for an upstream"""
+    with _sessions_lock:
+        if name not in _sessions:
+            _sessions[name] = UpstreamSession(upstreams[name])
+        return _sessions[name]
+
+
+# -------------------------------
+# httpx
+# -------------------------------
+class RetryTransport(httpx.BaseTransport):
+    """httpx transport adding retries with backoff and the circuit breaker"""
+
+    def __init__(self, upstream: Upstream, retries: int = None):
+        self.upstream = upstream
+        self.retries = upstream.max_retries if retries is None else retries
+        self._transport = httpx.HTTPTransport(limits=upstream.httpx_limits)
+
+    def handle_request(self, request):
+        with span(f"http.{self.upstream.name}", method=request.method):
+            return self._send(request)
+
+    def _send(self, request):
+        breaker = self.upstream.breaker
+        for attempt in range(self.retries + 1):
+            trial = breaker.before_call()
+            try:
+                response = self._transport.handle_request(request)
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                record_http(self.upstream.name, "error")
+                if attempt == self.retries or not should_retry(request.method, error=e):
+                    raise
+                time.sleep(backoff(attempt))
+                continue
+            except BaseException:
+                breaker.abandon(trial)
+                raise
+            breaker.record(response.status_code)
+            record_http(self.upstream.name, response.status_code)
+            if attempt == self.retries or not should_retry(request.method, response.status_code):
+                return response
+            response.close()
+            time.sleep(backoff(attempt, response.headers.get("Retry-After")))
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncRetryTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of RetryTransport"""
+
+    def __init__(self, upstream: Upstream, retries: int = None):
+        self.upstream = upstream
+        self.retries = upstream.max_retries if retries is None else retries
+        self._transport = httpx.AsyncHTTPTransport(limits=upstream.httpx_limits)
+
+    async def handle_async_request(self, request):
+        with span(f"http.{self.upstream.name}", method=request.method):
+            return await self._send(request)
+
+    async def _send(self, request):
+        breaker = self.upstream.breaker
+        for attempt in range(self.retries + 1):
+            trial = breaker.before_call()
+            try:
+                response = await self._transport.handle_async_request(request)
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                record_http(self.upstream.name, "error")
+                if attempt == self.retries or not should_retry(request.method, error=e):
+                    raise
+                await asyncio.sleep(backoff(attempt))
+                continue
+            except BaseException:
+                # Cancelled (client gone, wait_for deadline) or failed before a response
+                breaker.abandon(trial)
+                raise
+            breaker.record(response.status_code)
+            record_http(self.upstream.name, response.status_code)
+            if attempt == self.retries or not should_retry(request.method, response.status_code):
+                return response
+            await response.aclose()
+            await asyncio.sleep(backoff(attempt, response.headers.get("Retry-After")))
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+_clients = {}
+
+
+def client(name: str, retries: int = None) -> httpx.Client:
+    """Process-wide httpx client for an upstream"""
+    with _sessions_lock:
+        key = ("sync", name, retries)
+        if key not in _clients:
+            upstream = upstreams[name]
+            _clients[key] = httpx.Client(
+                timeout=upstream.httpx_timeout, transport=RetryTransport(upstream, retries)
+            )
+        return _clients[key]
+
+
+def async_client(name: str, retries: int = None) -> httpx.AsyncClient:
+    """Process-wide httpx.AsyncClient for an upstream"""
+    with _sessions_lock:
+        key = ("async", name, retries)
+        if key not in _clients:
+            upstream = upstreams[name]
+            _clients[key] = httpx.AsyncClient(
+                timeout=upstream.httpx_timeout, transport=AsyncRetryTransport(upstream, retries)
+            )
+        return _clients[key]
+
+
+# -------------------------------
+# Groq
+# -------------------------------
+_groq = {}
+
+
+def groq_client(asynchronous: bool = False):
+    """Groq SDK client on the shared pool, built on first use.
+
+    The SDK's own retries are off: it would retry against an open breaker and
+    repeat POSTs the upstream may have processed. The transport retries
+    instead; wrap calls in ``guarded("groq")``.
+    """
+    from groq import AsyncGroq, Groq
+
+    http = async_client("groq") if asynchronous else client("groq")
+    with _sessions_lock:
+        if asynchronous not in _groq:
+            upstream = upstreams["groq"]
+            cls = AsyncGroq if asynchronous else Groq
+            _groq[asynchronous] = cls(
+                api_key=os.getenv("GROQ_API_KEY"),
+                base_url=os.getenv("GROQ_BASE_URL") or None,
+                max_retries=0,
+                timeout=upstream.httpx_timeout,
+                http_client=http,
+            )
+        return _groq[asynchronous]
+
+
+def stats() -> dict:
+    return {name: upstream.breaker.stats() for name, upstream in upstreams.items()}
@@ -0,0 +1,104 @@
+import base64
+import binascii
+import io
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+_pool = None
+
+# Images uploaded by the serving layer, referenced from tool calls as "upload://<id>"
+UPLOAD_PREFIX = "upload://"
+MAX_UPLOADS = int(os.getenv("MAX_UPLOADS", "64"))
+_uploads = OrderedDict()
+_uploads_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    # PIL releases the GIL while decoding, so threads are enough for preprocessing
+    global _pool
+    if _pool is None:
+        workers = int(os.getenv("PREPROCESS_WORKERS", str(min(4, os.cpu_count() or 1))))
+        _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preprocess")
+    return _pool
+
+
+def register_upload(data: bytes) -> str:
+    """Keep uploaded bytes in memory and return a handle the tools accept"""
+    handle = UPLOAD_PREFIX + uuid.uuid4().hex
+    with _uploads_lock:
+        _uploads[handle] = bytes(data)
+        while len(_uploads) > MAX_UPLOADS:
+            _uploads.popitem(last=False)
+    return handle
+
+
+def local_file(source):
+    """Mark a string from trusted code as a file path; plain strings are never opened as files"""
+    return Path(source) if isinstance(source, str) else source
+
+
+def _resolve(source):
+    """Turn a Path, upload handle, data URI or base64 string into something PIL can open.
+
+    Strings reach here from LLM tool arguments, so they are never treated as
+    local paths; callers with a real file pass a ``Path``.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if isinstance(source, Path):
+        return str(source)
+    if not isinstance(source, str):
+        return source  # already a file object
+    if source.startswith(UPLOAD_PREFIX):
+        with _uploads_lock:
+            data = _uploads.get(source)
+        if data is None:
+            raise FileNotFoundError(f"Unknown or expired upload '{source}'")
+        return io.BytesIO(data)
+    if source.startswith("data:"):
+        source = source.split(",", 1)[-1]
+    try:
+        return io.BytesIO(base64.b64decode(source, validate=True))
+    except (binascii.Error, ValueError):
+        raise ValueError("Image must be an upload handle, a data URL or base64 bytes") from None
+
+
+def open_image(source, draft_size: int = 256) -> Image.Image:
+    """Open and RGB-convert an image from a Path, bytes, handle or file object.
+
+    JPEGs are decoded with draft mode straight to the smallest DCT scale that
+    still covers ``draft_size`` on both sides, so an 8-12 MP phone photo never
+    gets decoded at full resolution only to be resized to 224px.
+    """
+    image = Image.open(_resolve(source))
+    if draft_size and image.format == "JPEG":
+        image.draft("RGB", (draft_size, draft_size))
+    return image.convert("RGB")
+
+
+def load_batch(sources, transform) -> "torch.Tensor":
+    """Decode and transform images in the worker pool, stacked into one NCHW tensor"""
+    import torch  # only inference callers pay for torch; uploads don't need it
+
+    def prepare(source):
+        return transform(open_image(source))
+
+    tensors = list(_get_pool().map(prepare, sources))
+    return torch.stack(tensors)
+
+
+def top_k_predictions(outputs: "torch.Tensor", labels: list, k: int = 3) -> list:
+    """Per-row label plus the k most likely classes with softmax probabilities"""
+    probs = outputs.softmax(dim=1)
+    values, indices = probs.topk(min(k, probs.shape[1]), dim=1)
+    results = []
+    for row_values, row_indices in zip(values.tolist(), indices.tolist()):
+        ranked = [{"label": labels[i], "probability": round(p, 4)} for p, i in zip(row_values, row_indices)]
+        results.append({"label": ranked[0]["label"], "top_k": ranked})
+    return results
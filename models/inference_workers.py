@@ -0,0 +1,129 @@
+"""Disease classification in worker processes, off the web process's GIL.
+
+With INFERENCE_WORKERS=N (default 0: classify in-process) server.py starts
+the pool first thing in its lifespan: both classifiers load in this process
+and N workers are forked from it, so the weights are shared copy-on-write
+instead of loaded N times. Each worker pins torch (and onnxruntime) to
+INFERENCE_THREADS intra-op threads (default: cores / N) so the workers
+don't oversubscribe the box.
+
+At most N images are in the workers at once; up to INFERENCE_MAX_QUEUE more
+wait for INFERENCE_QUEUE_TIMEOUT seconds and anything beyond is shed with
+Overloaded, like the upstream limiters.
+
+The fork must happen while this process is still single-threaded and before
+it runs any inference (OpenMP and ONNX Runtime thread pools do not survive
+it). A pool started later, from a tool thread or outside the server, uses
+forkserver instead, with torch and the model code preloaded in the server
+process, and every worker loads its own copy of the weights. So does
+INFERENCE_START_METHOD=spawn or forkserver, the default for the torchscript
+and onnx backends, whose parity check runs inference at load. The onnx
+backend still exports its artifacts in this process before the workers
+start, and the workers only load them.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .admission import Limiter, limiters
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))
+INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", "32"))
+INFERENCE_QUEUE_TIMEOUT = float(os.getenv("INFERENCE_QUEUE_TIMEOUT", "10"))
+INFERENCE_START_METHOD = os.getenv("INFERENCE_START_METHOD", "")
+
+
+def _init_worker(threads: int):
+    import torch
+
+    torch.set_num_threads(threads)
+    from .model_registry import registry
+
+    # Already resident after a fork; spawned workers load their own copy here
+    registry.warm_up()
+
+
+def _classify_in_worker(name: str, image) -> dict:
+    from .disease_router import _classify
+
+    return _classify(name, image)
+
+
+class InferencePool:
+    def __init__(self, workers: int, threads: int = 0):
+        self.workers = workers
+        self.threads = threads or max(1, (os.cpu_count() or 1) // max(workers, 1))
+        self.limiter = Limiter("inference", max(workers, 1), INFERENCE_MAX_QUEUE, INFERENCE_QUEUE_TIMEOUT)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _start_method(self) -> str:
+        if INFERENCE_START_METHOD:
+            return INFERENCE_START_METHOD
+        from .optimize import INFERENCE_BACKEND
+
+        methods = multiprocessing.get_all_start_methods()
+        if INFERENCE_BACKEND == "eager" and "fork" in methods and threading.active_count() == 1:
+            return "fork"
+        return "forkserver" if "forkserver" in methods else "spawn"
+
+    def _context(self, method: str):
+        context = multiprocessing.get_context(method)
+        if method == "forkserver":
+            context.set_forkserver_preload(["torch", "models.disease_router"])
+        return context
+
+    def start(self) -> ProcessPoolExecutor:
+        """Start the workers, loading the models here first when forking (idempotent)"""
+        if self._executor is not None:
+            return self._executor
+        with self._lock:
+            if self._executor is None:
+                method = self._start_method()
+                from .optimize import INFERENCE_BACKEND
+
+                if method == "fork" or INFERENCE_BACKEND == "onnx":
+                    from .model_registry import registry
+
+                    # Fork: the workers share these weights. ONNX: export the artifacts once
+                    # here, so the workers reuse them instead of all writing the same files
+                    registry.warm_up()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=self._context(method),
+                    initializer=_init_worker,
+                    initargs=(self.threads,),
+                )
+                # Fork every worker now rather than on demand under load
+                for started in [self._executor.submit(os.getpid) for _ in range(self.workers)]:
+                    started.result()
+                limiters["inference"] = self.limiter
+                print(f"Inference pool: {self.workers} workers x {self.threads} threads ({method})")
+        return self._executor
+
+    def classify(self, name: str, image, deadline: float = None) -> dict:
+        """``disease_router._classify`` in a worker, waiting for a free one"""
+        executor = self.start()
+        with self.limiter.sync_slot(deadline):
+            try:
+                return executor.submit(_classify_in_worker, name, image).result()
+            except BrokenProcessPool:
+                print("❌ Inference worker died, restarting the pool")
+                self.shutdown(broken=executor)
+                raise
+
+    def shutdown(self, broken: ProcessPoolExecutor = None):
+        with self._lock:
+            if self._executor is not None and (broken is None or self._executor is broken):
+                self._executor.shutdown(wait=broken is None, cancel_futures=True)
+                self._executor = None
+
+
+inference_pool = InferencePool(INFERENCE_WORKERS, INFERENCE_THREADS)
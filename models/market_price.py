@@ -1,85 +1,141 @@
-import requests
+import threading
 from datetime import datetime
 from langchain_core.tools import tool
 import os
 
+from . import http_client
+from .admission import limiters
+from .cache import CachedSession, TTLCache
+from .price_store import PriceStore, from_iso_date, to_iso_date
+
 class DataGovScraper:
-    """Production-ready Data.gov.in scraper with 1,868 records"""
+    """Production-ready Data.gov.in scraper backed by a local price store"""
     
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, store: PriceStore = None):
+        # Mandi data changes daily, so an hour-old page is still good enough
+        cache = TTLCache(
+            maxsize=int(os.getenv("DATA_GOV_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("DATA_GOV_CACHE_TTL", "3600")),
+            path=os.getenv("DATA_GOV_CACHE_PATH") or None,
+        )
+        self.session = CachedSession(http_client.session("datagov"), cache)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
         
         self.api_key = os.getenv("DATA_GOV_API")
-        self.api_url = "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070"
+        self.api_url = os.getenv("DATA_GOV_API_URL", "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070")
+        self.page_size = int(os.getenv("DATA_GOV_PAGE_SIZE", "1000"))
+
+        self.store = store or PriceStore()
+        self._sync_lock = threading.Lock()
+        self._sync_thread = None
+        self._stop_sync = threading.Event()
+
+    # -------------------------------
+    # Sync
+    # -------------------------------
+    def sync(self) -> int:
+        """Pull records newer than the last arrival_date seen into the store.
+
+        Pages through the resource newest first with offset/limit and stops
+        as soon as a whole page is older than what the store already holds.
+        """
+        with self._sync_lock:
+            since = self.store.last_arrival_date() or ""
+            offset = 0
+            written = 0
+
+            while True:
+                params = {
+                    'api-key': self.api_key,
+                    'format': 'json',
+                    'limit': str(self.page_size),
+                    'offset': str(offset),
+                    'sort[arrival_date]': 'desc'
+                }
+                with limiters["datagov"].sync_slot():
+                    # Never from the page cache: a replayed newest-first page hides new arrivals
+                    response = self.session.get(self.api_url, params=params, use_cache=False)
+                if response.status_code != 200:
+                    raise RuntimeError(f"API Error: HTTP {response.status_code}")
+
+                records = response.json().get('records', [])
+                fresh = [r for r in records if to_iso_date(r.get('arrival_date')) >= since]
+                written += self.store.upsert(fresh)
+
+                if len(records) < self.page_size or (since and not fresh):
+                    break
+                offset += self.page_size
+
+            self.store.mark_synced()
+            return written
+
+    def start_background_sync(self, interval: float = None):
+        """Keep the store fresh from a daemon thread (interval in seconds)"""
+        if interval is None:
+            interval = float(os.getenv("PRICE_SYNC_INTERVAL", str(6 * 60 * 60)))
+        if interval <= 0 or (self._sync_thread and self._sync_thread.is_alive()):
+            return
+
+        def run():
+            while not self._stop_sync.is_set():
+                try:
+                    written = self.sync()
+                    print(f"Price sync: {written} records updated")
+                except Exception as e:
+                    print(f"Price sync failed: {e}")
+                self._stop_sync.wait(interval)
+
+        self._stop_sync.clear()
+        self._sync_thread = threading.Thread(target=run, name="price-sync", daemon=True)
+        self._sync_thread.start()
+
+    def stop_background_sync(self):
+        self._stop_sync.set()
 
+    def _ensure_data(self):
+        # First use before the background job has populated anything
+        if self.store.is_empty():
+            self.sync()
+
+    # -------------------------------
+    # Lookups
+    # -------------------------------
     def get_market_price(self, crop: str, location: str = "") -> str:
-        """Get real market prices from Data.gov.in with flexible matching"""
+        """Get real market prices from the local Data.gov.in store with flexible matching"""
         
         try:
-            params = {
-                'api-key': self.api_key,
-                'format': 'json',
-                'limit': '10000000000',  # Get more records for better matching
-                'offset': '0'
-            }
-            
-            response = self.session.get(self.api_url, params=params, timeout=15)
-            
-            if response.status_code != 200:
-                return f"API Error: HTTP {response.status_code}"
-            
-            data = response.json()
-            records = data.get('records', [])
-            
-            if not records:
+            self._ensure_data()
+            if self.store.is_empty():
                 return f"No data available from Data.gov.in"
-            
-            # Smart matching logic
-            crop_matches = []
-            
-            for record in records:
-                commodity = str(record.get('commodity', '')).lower()
-                state = str(record.get('state', '')).lower()
-                
-                # Flexible crop matching
-                crop_match = (
-                    crop.lower() in commodity or 
-                    commodity.startswith(crop.lower()[:3]) or
-                    crop.lower() == 'rice' and 'paddy' in commodity
-                )
-                
-                # Flexible location matching (if specified)
-                location_match = (
-                    not location or  # No location specified
-                    location.lower() in state or
-                    state.startswith(location.lower()[:3])
-                )
-                
-                if crop_match and location_match:
-                    crop_matches.append(record)
+
+            crop_matches = self.store.find_prices(crop, location)
             
             if not crop_matches:
                 return f"❌ No data found for '{crop}' in Data.gov.in database"
             
-            # Use best match with modal_price
-            for record in crop_matches:
-                modal_price = record.get('modal_price')
-                if modal_price and str(modal_price).replace('.', '').isdigit():
-                    
-                    commodity = record.get('commodity', crop)
-                    state = record.get('state', 'Unknown State')
-                    market = record.get('market', 'Unknown Market')
-                    date = record.get('arrival_date', datetime.now().strftime('%d/%m/%Y'))
-                    variety = record.get('variety', '')
-                    
-                    variety_info = f" ({variety})" if variety and variety != commodity else ""
-                    
-                    return f"✅ Current {commodity}{variety_info} price in {state}: ₹{modal_price}/quintal (Market: {market}, Date: {date}, Source: Data.gov.in)"
+            record = crop_matches[0]
+            modal_price = record.get('modal_price')
+            modal_price = int(modal_price) if float(modal_price).is_integer() else modal_price
+
+            commodity = record.get('commodity') or crop
+            state = record.get('state') or 'Unknown State'
+            market = record.get('market') or 'Unknown Market'
+            date = from_iso_date(record.get('arrival_date')) or datetime.now().strftime('%d/%m/%Y')
+            variety = record.get('variety', '')
+            
+            variety_info = f" ({variety})" if variety and variety != commodity else ""
             
-            return f"❌ Price data incomplete for '{crop}'"
+            return f"✅ Current {commodity}{variety_info} price in {state}: ₹{modal_price}/quintal (Market: {market}, Date: {date}, Source: Data.gov.in)"
             
         except Exception as e:
             return f"❌ Error: {str(e)}"
+
+    def cache_stats(self) -> dict:
+        return self.session.cache.stats()
+
+    def get_crop_locations(self, crop: str):
+        """States that have price data for the crop"""
+        self._ensure_data()
+        return self.store.states_for(crop)
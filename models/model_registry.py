@@ -0,0 +1,95 @@
+import os
+import threading
+
+import torch
+
+from .Disease_detect import load_model, device, model_path, classes, PLANT_TRANSFORM
+from .predict_wheat_disease import load_model_wheat, class_names, wheat_model_path, VAL_TEST_TRANSFORM
+from .optimize import load_optimized
+
+PARITY_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+class ModelRegistry:
+    """Loads each classifier once and keeps it resident in eval mode.
+
+    Loading happens lazily on the first ``get`` (or eagerly via ``warm_up``);
+    a per-model lock makes concurrent first requests wait for a single load.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader):
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks[name] = threading.Lock()
+            self._models.pop(name, None)
+
+    def get(self, name: str):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model '{name}'")
+        with self._locks[name]:
+            model = self._models.get(name)
+            if model is None:
+                model = self._loaders[name]()
+                model.eval()
+                self._models[name] = model
+        return model
+
+    def warm_up(self, names=None):
+        for name in names or list(self._loaders):
+            self.get(name)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def unload(self, name: str):
+        with self._locks[name]:
+            self._models.pop(name, None)
+
+
+def _parity_inputs(transform):
+    """Sample images for the accuracy-parity check (random inputs when unset)"""
+    folder = os.getenv("INFERENCE_PARITY_IMAGES")
+    if not folder or not os.path.isdir(folder):
+        return None
+    from pathlib import Path
+
+    from .image_io import open_image
+
+    tensors = []
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(PARITY_IMAGE_EXTENSIONS):
+            continue
+        try:
+            tensors.append(transform(open_image(Path(folder, name))))
+        except (OSError, ValueError) as e:
+            print(f"Skipping parity image {name}: {e}")
+            continue
+        if len(tensors) == 16:
+            break
+    return torch.stack(tensors) if tensors else None
+
+
+def _cpu_optimized(loader, name: str, transform, source: str):
+    # The optimised runtimes are CPU-only; GPU nodes keep the eager model
+    if device != "cpu":
+        return loader()
+    return load_optimized(loader, name, _parity_inputs(transform), source)
+
+
+registry = ModelRegistry()
+registry.register("plant", lambda: _cpu_optimized(
+    lambda: load_model(model_path, num_classes=len(classes), device=device), "plant", PLANT_TRANSFORM, model_path))
+registry.register("wheat", lambda: _cpu_optimized(
+    lambda: load_model_wheat(wheat_model_path, num_classes=len(class_names), device=device), "wheat", VAL_TEST_TRANSFORM, wheat_model_path))
+
+if os.getenv("PRELOAD_MODELS", "").lower() in ("1", "true", "yes"):
+    registry.warm_up()
@@ -0,0 +1,168 @@
+import copy
+import hashlib
+import os
+
+import torch
+import torch.nn as nn
+
+# eager | torchscript | onnx
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "eager").lower()
+INFERENCE_QUANTIZE = os.getenv("INFERENCE_QUANTIZE", "0").lower() in ("1", "true", "yes")
+INFERENCE_CHANNELS_LAST = os.getenv("INFERENCE_CHANNELS_LAST", "1").lower() in ("1", "true", "yes")
+INFERENCE_PARITY_CHECK = os.getenv("INFERENCE_PARITY_CHECK", "1").lower() in ("1", "true", "yes")
+ONNX_DIR = os.getenv("ONNX_DIR", "onnx_models")
+
+
+class ChannelsLast(nn.Module):
+    """Feeds NHWC-strided inputs to a model whose weights are already channels-last"""
+
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x):
+        return self.model(x.contiguous(memory_format=torch.channels_last))
+
+
+class OnnxModel:
+    """onnxruntime session that quacks like an eval-mode nn.Module"""
+
+    def __init__(self, path: str, threads: int = 0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        outputs = self.session.run(None, {self.input_name: x.detach().cpu().numpy()})
+        return torch.from_numpy(outputs[0])
+
+    def eval(self):
+        return self
+
+    def to(self, *args, **kwargs):
+        return self
+
+
+def _example_input(batch: int = 1, size: int = 224) -> torch.Tensor:
+    return torch.randn(batch, 3, size, size)
+
+
+def to_torchscript(model: nn.Module, quantize: bool, channels_last: bool) -> torch.jit.ScriptModule:
+    model = model.cpu().eval()
+    if quantize:
+        # Dynamic int8 only covers the Linear head in PyTorch; convolutions stay fp32
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    if channels_last:
+        # Convert a copy: the eager model is still the parity reference and the fallback
+        model = ChannelsLast(copy.deepcopy(model).to(memory_format=torch.channels_last)).eval()
+    with torch.no_grad():
+        traced = torch.jit.trace(model, _example_input())
+        traced = torch.jit.freeze(traced)
+        return torch.jit.optimize_for_inference(traced)
+
+
+def checkpoint_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def _write_atomically(path: str, write):
+    # Other processes (inference workers) may be loading or writing the same artifact
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def to_onnx(model: nn.Module, name: str, quantize: bool, source: str = None) -> OnnxModel:
+    """Export (and optionally quantise) to ONNX_DIR, reusing the artifact while ``source`` is unchanged"""
+    os.makedirs(ONNX_DIR, exist_ok=True)
+    if source and os.path.exists(source):
+        name = f"{name}-{checkpoint_hash(source)}"
+    fp32_path = os.path.join(ONNX_DIR, f"{name}.onnx")
+    path = os.path.join(ONNX_DIR, f"{name}.int8.onnx") if quantize else fp32_path
+
+    if not (source and os.path.exists(path)):
+        if not (source and os.path.exists(fp32_path)):
+            _write_atomically(fp32_path, lambda tmp: torch.onnx.export(
+                model.cpu().eval(), _example_input(), tmp,
+                input_names=["input"], output_names=["logits"],
+                dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+                opset_version=17,
+            ))
+        if quantize:
+            # onnxruntime quantises Conv as well as MatMul, unlike torch dynamic quantisation
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            _write_atomically(path, lambda tmp: quantize_dynamic(fp32_path, tmp, weight_type=QuantType.QInt8))
+    # In an inference worker torch is already pinned to INFERENCE_THREADS; onnxruntime follows it
+    return OnnxModel(path, threads=torch.get_num_threads())
+
+
+def optimize_model(model: nn.Module, name: str, backend: str = None,
+                   quantize: bool = None, channels_last: bool = None, source: str = None):
+    """Convert an eager model to the configured CPU runtime (eager models pass through).
+
+    ``source`` is the checkpoint the model was loaded from; the ONNX backend
+    keys its exported files on it.
+    """
+    backend = (backend or INFERENCE_BACKEND).lower()
+    quantize = INFERENCE_QUANTIZE if quantize is None else quantize
+    channels_last = INFERENCE_CHANNELS_LAST if channels_last is None else channels_last
+
+    if backend == "eager":
+        return model
+    if backend == "torchscript":
+        return to_torchscript(model, quantize, channels_last)
+    if backend == "onnx":
+        return to_onnx(model, name, quantize, source)
+    raise ValueError(f"Unknown inference backend '{backend}'")
+
+
+@torch.no_grad()
+def check_parity(reference: nn.Module, candidate, inputs: torch.Tensor = None,
+                 atol: float = 0.05, min_agreement: float = 0.95) -> dict:
+    """Compare softmax outputs and top-1 labels of an optimised model against eager"""
+    if inputs is None:
+        inputs = _example_input(batch=8)
+    expected = torch.softmax(reference.cpu()(inputs), dim=1)
+    actual = torch.softmax(candidate(inputs).float(), dim=1)
+
+    max_abs_diff = float((expected - actual).abs().max())
+    agreement = float((expected.argmax(dim=1) == actual.argmax(dim=1)).float().mean())
+    return {
+        "max_abs_diff": round(max_abs_diff, 5),
+        "top1_agreement": agreement,
+        "ok": max_abs_diff <= atol and agreement >= min_agreement,
+    }
+
+
+def load_optimized(loader, name: str, parity_inputs: torch.Tensor = None, source: str = None):
+    """Build the eager model, optimise it and keep it only if it matches the eager output"""
+    model = loader()
+    if INFERENCE_BACKEND == "eager":
+        return model
+    try:
+        optimized = optimize_model(model, name, source=source)
+    except Exception as e:
+        print(f"Optimising {name} for {INFERENCE_BACKEND} failed, using eager: {e}")
+        return model
+
+    if INFERENCE_PARITY_CHECK:
+        report = check_parity(model, optimized, parity_inputs)
+        print(f"{name} {INFERENCE_BACKEND} parity: {report}")
+        if not report["ok"]:
+            return model
+    return optimized
@@ -5,14 +5,18 @@ import os
 import torch
 import torch.nn as nn
 from torchvision import models, transforms, datasets
-from PIL import Image
+
+from .image_io import load_batch, local_file, open_image, top_k_predictions
+from .labels import class_names
 
 
 # Match the architecture used during training
 class ResNet50V2(nn.Module):
-    def __init__(self, num_classes: int):
+    def __init__(self, num_classes: int, pretrained: bool = False):
         super().__init__()
-        self.model = models.resnet50(weights=models.ResNet50_Weights.IMAGENET1K_V2)
+        # ImageNet weights only matter for training; inference overwrites them from the checkpoint
+        weights = models.ResNet50_Weights.IMAGENET1K_V2 if pretrained else None
+        self.model = models.resnet50(weights=weights)
         num_ftrs = self.model.fc.in_features
         self.model.fc = nn.Sequential(
             nn.Linear(num_ftrs, 256),
@@ -53,16 +57,28 @@ def load_model_wheat(weights_path: str, num_classes: int, device: torch.device)
 
 
 @torch.no_grad()
-def predict_image_wheat(image_path: str, model: nn.Module, class_names: list[str], device: torch.device) -> str:
-    image = Image.open(image_path).convert("RGB")
+def predict_image_wheat(image_path, model: nn.Module, labels: list[str], device: torch.device) -> str:
+    image = open_image(local_file(image_path))
     tensor = VAL_TEST_TRANSFORM(image).unsqueeze(0).to(device)
     outputs = model(tensor)
     if isinstance(outputs, (list, tuple)):
         outputs = outputs[0]
     pred_idx = int(outputs.argmax(dim=1).item())
-    return class_names[pred_idx]
+    return labels[pred_idx]
+
+
+@torch.no_grad()
+def predict_images_wheat(images: list, model: nn.Module, labels: list[str], device: torch.device,
+                         top_k: int = 3, batch_size: int = 16) -> list[dict]:
+    """Batched predict_image_wheat: labels plus top-k probabilities for each image"""
+    results = []
+    for start in range(0, len(images), batch_size):
+        batch = load_batch([local_file(i) for i in images[start:start + batch_size]], VAL_TEST_TRANSFORM).to(device)
+        outputs = model(batch)
+        if isinstance(outputs, (list, tuple)):
+            outputs = outputs[0]
+        results.extend(top_k_predictions(outputs, labels, top_k))
+    return results
 
-class_names = ['Aphid', 'Black Rust', 'Blast', 'Brown Rust', 'Common Root Rot', 'Fusarium Head Blight', 'Healthy',
-           'Leaf Blight', 'Mildew', 'Mite', 'Septoria', 'Smut', 'Stem fly', 'Tan spot', 'Yellow Rust']
 
 wheat_model_path = os.getenv("WHEAT_MODE_PATH")
\ No newline at end of file
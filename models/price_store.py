@@ -0,0 +1,216 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from .crop_aliases import commodity_key, normalise_commodity, normalise_state
+
+
+def to_iso_date(value: str) -> str:
+    """Convert Data.gov.in dd/mm/yyyy dates to sortable yyyy-mm-dd."""
+    value = str(value or "").strip()
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return ""
+
+
+def from_iso_date(value: str) -> str:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%d/%m/%Y")
+    except (TypeError, ValueError):
+        return value or ""
+
+
+def to_price(value):
+    try:
+        return float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+class PriceStore:
+    """On-disk SQLite copy of the Data.gov.in mandi price resource"""
+
+    COLUMNS = ("state", "district", "market", "commodity", "variety", "grade",
+               "arrival_date", "min_price", "max_price", "modal_price",
+               "commodity_key", "state_key")
+    SCHEMA_VERSION = 3
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.getenv("PRICE_DB_PATH", "mandi_prices.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._commodity_keys = None
+        self._state_keys = None
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < self.SCHEMA_VERSION:
+                # Older layouts lack the keys (or aliased them); drop them and let the next sync refill
+                self._conn.execute("DROP TABLE IF EXISTS prices")
+                self._conn.execute("DROP TABLE IF EXISTS sync_state")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS prices (
+                    state TEXT, district TEXT, market TEXT, commodity TEXT,
+                    variety TEXT, grade TEXT, arrival_date TEXT,
+                    min_price REAL, max_price REAL, modal_price REAL,
+                    commodity_key TEXT, state_key TEXT,
+                    PRIMARY KEY (state, district, market, commodity, variety, grade, arrival_date)
+                )
+            """)
+            # (commodity, state) -> rows newest first, so a lookup is one index probe plus a slice
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_prices_commodity_state
+                ON prices (commodity_key, state_key, arrival_date DESC)
+            """)
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_prices_commodity_date
+                ON prices (commodity_key, arrival_date DESC)
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)
+            """)
+            self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    # -------------------------------
+    # Writes
+    # -------------------------------
+    def upsert(self, records) -> int:
+        """Insert or refresh raw API records, returns the number written"""
+        rows = []
+        for record in records:
+            arrival_date = to_iso_date(record.get("arrival_date"))
+            if not arrival_date:
+                continue
+            state = str(record.get("state", ""))
+            commodity = str(record.get("commodity", ""))
+            rows.append((
+                state, str(record.get("district", "")),
+                str(record.get("market", "")), commodity,
+                str(record.get("variety", "")), str(record.get("grade", "")),
+                arrival_date, to_price(record.get("min_price")),
+                to_price(record.get("max_price")), to_price(record.get("modal_price")),
+                commodity_key(commodity), normalise_state(state),
+            ))
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO prices ({', '.join(self.COLUMNS)}) VALUES ({placeholders})",
+                rows,
+            )
+            newest = max(row[6] for row in rows)
+            self._conn.execute(
+                "INSERT INTO sync_state (key, value) VALUES ('last_arrival_date', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = max(value, excluded.value)",
+                (newest,),
+            )
+            self._commodity_keys = self._state_keys = None
+        return len(rows)
+
+    def mark_synced(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('last_sync', ?)",
+                (datetime.now().isoformat(timespec="seconds"),),
+            )
+
+    # -------------------------------
+    # Reads
+    # -------------------------------
+    def _state_value(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def last_arrival_date(self):
+        return self._state_value("last_arrival_date")
+
+    def last_sync(self):
+        return self._state_value("last_sync")
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM prices LIMIT 1").fetchone() is None
+
+    def _distinct(self, column: str):
+        with self._lock:
+            return [row[0] for row in self._conn.execute(f"SELECT DISTINCT {column} FROM prices") if row[0]]
+
+    def _resolve(self, key: str, known) -> list:
+        """Exact key, else known keys starting with / containing the query"""
+        if not key:
+            return []
+        if key in known:
+            return [key]
+        prefixed = [k for k in known if k.startswith(key)]
+        return prefixed or [k for k in known if key in k]
+
+    def _commodities(self, crop: str) -> list:
+        # "rice" asks for genuine Rice rows as well as Paddy(Dhan) ones; stored keys are never aliased
+        known = self.commodity_keys()
+        keys = list(dict.fromkeys((normalise_commodity(crop), commodity_key(crop))))
+        exact = [key for key in keys if key in known]
+        return exact or next((found for found in (self._resolve(key, known) for key in keys) if found), [])
+
+    def commodity_keys(self):
+        if self._commodity_keys is None:
+            self._commodity_keys = set(self._distinct("commodity_key"))
+        return self._commodity_keys
+
+    def state_keys(self):
+        if self._state_keys is None:
+            self._state_keys = set(self._distinct("state_key"))
+        return self._state_keys
+
+    def find_prices(self, crop: str, location: str = "", limit: int = 1):
+        """Newest records with a modal price for the crop and (optional) state"""
+        commodities = self._commodities(crop)
+        if not commodities:
+            return []
+
+        states = None
+        if location and location.strip():
+            states = self._resolve(normalise_state(location), self.state_keys())
+            if not states:
+                return []
+
+        rows = []
+        with self._lock:
+            for key in commodities:
+                if states is None:
+                    rows += self._conn.execute(
+                        "SELECT * FROM prices WHERE commodity_key = ? AND modal_price IS NOT NULL "
+                        "ORDER BY arrival_date DESC LIMIT ?",
+                        (key, limit),
+                    ).fetchall()
+                    continue
+                for state_key in states:
+                    rows += self._conn.execute(
+                        "SELECT * FROM prices WHERE commodity_key = ? AND state_key = ? "
+                        "AND modal_price IS NOT NULL ORDER BY arrival_date DESC LIMIT ?",
+                        (key, state_key, limit),
+                    ).fetchall()
+
+        rows = sorted((dict(row) for row in rows), key=lambda r: r["arrival_date"], reverse=True)
+        return rows[:limit]
+
+    def states_for(self, crop: str):
+        commodities = self._commodities(crop)
+        if not commodities:
+            return []
+        placeholders = ", ".join("?" for _ in commodities)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT state FROM prices WHERE commodity_key IN ({placeholders})",
+                commodities,
+            )
+            return sorted(row["state"] for row in rows if row["state"])
@@ -1,106 +1,301 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+"""Scrape farmer schemes from myscheme.gov.in into the catalogue the tools read.
+
+The search page is visited once to collect every card, detail pages are then
+fetched concurrently by a bounded pool of workers (plain HTTP or one headless
+browser per worker), and each finished scheme is appended to a JSONL
+checkpoint straight away. A re-run skips cards that are unchanged and were
+scraped within --max-age days, so an interrupted scrape resumes where it
+stopped; older ones are re-fetched and kept only if their content hash (card
+plus detail page) changed. The checkpoint is compacted to one line per
+scheme once the run completes.
+
+    python -m models.schemes --workers 8 --output scheme.json
+"""
+import argparse
+import hashlib
 import json
-from selenium.webdriver.common.keys import Keys
+import os
+import threading
 import time
-chrome_options = Options()
-# chrome_options.add_argument("--head")
-chrome_options.add_argument("--no-sandbox")
-chrome_options.add_argument("--disable-dev-shm-usage")
-
-driver = webdriver.Chrome(options=chrome_options)
-wait = WebDriverWait(driver, 60)  # 10 seconds wait
-
-driver.get("https://www.myscheme.gov.in/search/category/Agriculture%2CRural%20%26%20Environment")
-# Wait until the cards are present instead of sleep
-input_box = driver.find_element(By.NAME, "query")
-driver.execute_script("arguments[0].setAttribute('value', 'kisan');", input_box)
-
-wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.p-4")))
-cards = driver.find_elements(By.CSS_SELECTOR, "div.p-4")
-# time.sleep(10)
-# print(len(cards))
-schemes = []
-
-
-# click the button
-# for x in range(2):
-    # path = driver.find_element(By.XPATH, "//svg[@class='ml-2 text-darkblue-900 dark:text-white cursor-pointer']/*[name()='path'][2]")
-    # path.click()
-    # time.sleep(3)
-for i in range(len(cards)):
-    time.sleep(0.5)
-    search_input = WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, "input[name='query']"))
-    )
-
-    # clear and type 'kisan'
-    search_input.clear()
-    search_input.send_keys("kisan")
-
-    # wait until the button becomes clickable
-    search_button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.CSS_SELECTOR, "button[aria-label='Search']"))
-    )
-    search_button.click()
-    time.sleep(1)
-
-    cards = driver.find_elements(By.CSS_SELECTOR, "div.p-4")
-    print(len(cards))
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+
+from . import http_client
+
+SEARCH_URL = "https://www.myscheme.gov.in/search/category/Agriculture%2CRural%20%26%20Environment"
+
+CARD_SELECTOR = "div.p-4"
+CARD_FIELDS = {
+    "title": "h2[id^='scheme-name'] a",
+    "ministry": "h2.mt-3",
+    "description": "span[aria-label*='Brief description']",
+}
+DETAIL_SECTIONS = {
+    "details": "div#details",
+    "eligibility": "div#eligibility",
+    "application_process": "div#application-process",
+    "documents_required": "div#documents-required",
+}
+CARD_KEYS = ["title", "link", "ministry", "description"]
+FIELDS = [*CARD_KEYS, *DETAIL_SECTIONS]
+DAY = 24 * 60 * 60
+
+
+def _hash(record: dict, keys: list) -> str:
+    payload = json.dumps({k: record.get(k) for k in keys}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def card_hash(card: dict) -> str:
+    """Fingerprint of what the search card shows; a change means the detail page is re-fetched"""
+    return _hash(card, CARD_KEYS)
+
+
+def content_hash(record: dict) -> str:
+    """Fingerprint of the whole scheme, detail page included"""
+    return _hash(record, FIELDS)
+
+
+# -------------------------------
+# Search page
+# -------------------------------
+def parse_cards(html: str, base_url: str) -> list:
+    soup = BeautifulSoup(html, "html.parser")
+    cards = []
+    for card in soup.select(CARD_SELECTOR):
+        title_tag = card.select_one(CARD_FIELDS["title"])
+        if title_tag is None or not title_tag.get("href"):
+            continue
+        ministry = card.select_one(CARD_FIELDS["ministry"])
+        description = card.select_one(CARD_FIELDS["description"])
+        cards.append({
+            "title": title_tag.get_text(strip=True),
+            "link": urljoin(base_url, title_tag["href"]),
+            "ministry": ministry.get_text(strip=True) if ministry else None,
+            "description": description.get_text(strip=True) if description else None,
+        })
+    return cards
+
+
+def collect_cards_http(search_url: str, query: str, session: requests.Session, timeout: float = 30) -> list:
+    response = session.get(search_url, params={"q": query} if query else None, timeout=timeout)
+    response.raise_for_status()
+    return parse_cards(response.text, search_url)
+
+
+def collect_cards_browser(search_url: str, query: str, headless: bool = True, timeout: float = 60) -> list:
+    """Run the search once in a real browser and read every card from the rendered page"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    driver = new_driver(headless)
     try:
-        card = cards[i]
-        title_tag = card.find_element(By.CSS_SELECTOR, "h2[id^='scheme-name'] a")
-        title = title_tag.text
-        link = title_tag.get_attribute("href")
+        driver.get(search_url)
+        wait = WebDriverWait(driver, timeout)
+        if query:
+            search_input = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "input[name='query']")))
+            search_input.clear()
+            search_input.send_keys(query)
+            wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button[aria-label='Search']"))).click()
+        wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, CARD_SELECTOR)))
+        return parse_cards(driver.page_source, search_url)
+    finally:
+        driver.quit()
+
+
+# -------------------------------
+# Detail pages
+# -------------------------------
+def parse_detail(html: str) -> dict:
+    soup = BeautifulSoup(html, "html.parser")
+    detail = {}
+    for field, selector in DETAIL_SECTIONS.items():
+        section = soup.select_one(selector)
+        detail[field] = section.get_text("\n", strip=True) if section else None
+    return detail
+
+
+def new_driver(headless: bool = True):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    return webdriver.Chrome(options=chrome_options)
+
 
-        ministry_tag = card.find_elements(By.CSS_SELECTOR, "h2.mt-3")
-        ministry = ministry_tag[0].text if ministry_tag else None
+class HttpFetcher:
+    def __init__(self, session: requests.Session = None, timeout: float = 30):
+        self.session = session or http_client.session("myscheme")
+        self.timeout = timeout
 
-        desc_tag = card.find_elements(By.CSS_SELECTOR, "span[aria-label*='Brief description']")
-        description = desc_tag[0].text if desc_tag else None
+    def __call__(self, link: str) -> dict:
+        response = self.session.get(link, timeout=self.timeout)
+        response.raise_for_status()
+        return parse_detail(response.text)
 
-        # Go to scheme page
+    def close(self):
+        # The session is the shared pooled one or the caller's, neither is ours to close
+        pass
+
+
+class BrowserFetcher:
+    """One browser per worker thread, waiting on the details section instead of sleeping"""
+
+    def __init__(self, headless: bool = True, timeout: float = 60):
+        self.headless = headless
+        self.timeout = timeout
+        self._local = threading.local()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    def _driver(self):
+        driver = getattr(self._local, "driver", None)
+        if driver is None:
+            driver = new_driver(self.headless)
+            self._local.driver = driver
+            with self._lock:
+                self._drivers.append(driver)
+        return driver
+
+    def __call__(self, link: str) -> dict:
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        driver = self._driver()
         driver.get(link)
-        # Wait until the details section is present
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "div#details")))
-
-        try:
-            details = driver.find_element(By.CSS_SELECTOR, "div#details").text
-            eligibility = driver.find_element(By.CSS_SELECTOR, "div#eligibility").text
-            application_process = driver.find_element(By.CSS_SELECTOR, "div#application-process").text
-            documents_required = driver.find_element(By.CSS_SELECTOR, "div#documents-required").text
-        except:
-            details = eligibility = application_process = documents_required = None
-
-        schemes.append({
-            "title": title,
-            "link": link,
-            "ministry": ministry,
-            "description": description,
-            "details": details,
-            "eligibility": eligibility,
-            "application_process": application_process,
-            "documents_required": documents_required,
-        })
+        WebDriverWait(driver, self.timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, DETAIL_SECTIONS["details"]))
+        )
+        return parse_detail(driver.page_source)
+
+    def close(self):
+        for driver in self._drivers:
+            driver.quit()
+
+
+# -------------------------------
+# Checkpoint + catalogue
+# -------------------------------
+def load_checkpoint(path: str) -> dict:
+    """Latest record per link from the JSONL checkpoint"""
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            records[record["link"]] = record
+    return records
+
+
+def compact_checkpoint(path: str, records: dict):
+    """Rewrite the append-only checkpoint with the latest record per link"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records.values():
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+
 
-        # Go back to main page
-        driver.back()
-        # Wait until the cards are present again
-        wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.p-4")))
+def merge_into_catalogue(records, output: str):
+    """Update the catalogue JSON by link and replace it atomically"""
+    existing = []
+    if os.path.exists(output):
+        with open(output, encoding="utf-8") as f:
+            existing = json.load(f)
 
-    except Exception as e:
-        print("Error:", e)
-        continue
-# path = driver.find_element(By.XPATH, "//svg[@class='ml-2 text-darkblue-900 dark:text-white cursor-pointer']/*[name()='path'][2]")
-# path.click()
+    merged = {scheme["link"]: scheme for scheme in existing}
+    for record in records:
+        merged[record["link"]] = {field: record.get(field) for field in FIELDS}
+
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(list(merged.values()), f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, output)
+    return len(merged)
+
+
+def _is_fresh(record: dict, card: dict, max_age: float) -> bool:
+    if not record or record.get("card_hash") != card_hash(card):
+        return False
+    return time.time() - record.get("scraped_at", 0) < max_age
+
+
+def scrape(cards: list, fetch, checkpoint: str, workers: int = 4, max_age_days: float = 7) -> list:
+    """Fetch details for new, changed or stale cards concurrently, checkpointing each result"""
+    done = load_checkpoint(checkpoint)
+    todo = [card for card in cards if not _is_fresh(done.get(card["link"]), card, max_age_days * DAY)]
+    print(f"{len(cards)} schemes found, {len(cards) - len(todo)} fresh, {len(todo)} to fetch")
+
+    changed = 0
+    write_lock = threading.Lock()
+    with open(checkpoint, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch, card["link"]): card for card in todo}
+        for future in as_completed(futures):
+            card = futures[future]
+            try:
+                detail = future.result()
+            except Exception as e:
+                print(f"Error fetching {card['link']}: {e}")
+                continue
+            record = {**card, **detail, "card_hash": card_hash(card), "scraped_at": time.time()}
+            record["hash"] = content_hash(record)
+            changed += done.get(card["link"], {}).get("hash") != record["hash"]
+            with write_lock:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+            done[card["link"]] = record
+
+    print(f"{changed} of {len(todo)} fetched schemes changed")
+    compact_checkpoint(checkpoint, done)
+    links = {card["link"] for card in cards}
+    return [record for link, record in done.items() if link in links]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--search-url", default=SEARCH_URL)
+    parser.add_argument("--query", default="kisan")
+    parser.add_argument("--fetcher", choices=["http", "browser"], default="browser",
+                        help="how to load pages (http works against pre-rendered or fixture HTML)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--checkpoint", default="schemes.jsonl")
+    parser.add_argument("--max-age", type=float, default=7, help="days before an unchanged card is re-fetched")
+    parser.add_argument("--output", default="scheme.json")
+    parser.add_argument("--show-browser", action="store_true")
+    args = parser.parse_args(argv)
+
+    headless = not args.show_browser
+    if args.fetcher == "http":
+        fetch = HttpFetcher()
+        cards = collect_cards_http(args.search_url, args.query, fetch.session)
+    else:
+        fetch = BrowserFetcher(headless=headless)
+        cards = collect_cards_browser(args.search_url, args.query, headless=headless)
+
+    try:
+        records = scrape(cards, fetch, args.checkpoint, workers=args.workers, max_age_days=args.max_age)
+    finally:
+        fetch.close()
 
+    total = merge_into_catalogue(records, args.output)
+    print(f"Saved {len(records)} scraped schemes, {total} in {args.output}")
 
-driver.quit()
 
-# Save to JSON
-with open("schemeas.json", "w", encoding="utf-8") as f:
-    json.dump(schemes, f, ensure_ascii=False, indent=4)
-    print("sasda")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Spans and Prometheus-style metrics for the voice pipeline.
+
+Enabled with TRACING=1; otherwise ``span`` hands back a shared no-op and
+``traced`` leaves functions untouched, so the instrumentation costs nothing.
+
+While enabled every span feeds the ``krishi_stage_duration_seconds``
+histogram (rendered by ``render_metrics`` for GET /metrics). A fraction
+TRACE_SAMPLE_RATE of turns is also exported: through OpenTelemetry when an
+SDK TracerProvider is set (configure it and its exporter before this module
+is imported), and as OTLP-shaped JSON lines to TRACE_FILE whenever that is
+set.
+"""
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+
+TRACING_ENABLED = os.getenv("TRACING", "0").lower() in ("1", "true", "yes")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+TRACE_FILE = os.getenv("TRACE_FILE")
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_current = contextvars.ContextVar("krishi_span", default=None)
+
+
+# -------------------------------
+# Metrics
+# -------------------------------
+def _labels_text(labels: tuple) -> str:
+    return ",".join(f'{k}="{str(v)}"' for k, v in labels)
+
+
+def _series(name: str, labels: tuple) -> str:
+    return f"{name}{{{_labels_text(labels)}}}" if labels else name
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                prefix = _labels_text(key)
+                prefix = prefix + "," if prefix else ""
+                for bound, count in zip(self.buckets, series["counts"]):
+                    lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series["count"]}')
+                lines.append(f"{_series(self.name + '_sum', key)} {series['sum']:.6f}")
+                lines.append(f"{_series(self.name + '_count', key)} {series['count']}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{_series(self.name, key)} {value}")
+        return lines
+
+
+stage_duration = Histogram("krishi_stage_duration_seconds", "Time spent per pipeline stage")
+llm_tokens = Counter("krishi_llm_tokens_total", "LLM tokens by stage and direction")
+cache_events = Counter("krishi_cache_events_total", "Cache lookups by cache and result")
+upstream_responses = Counter("krishi_upstream_responses_total", "Upstream HTTP responses by status")
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in (stage_duration, llm_tokens, cache_events, upstream_responses):
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------
+# Spans
+# -------------------------------
+def _otel_tracer():
+    # The API package alone hands out a no-op tracer, so only use a configured SDK
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.trace import TracerProvider
+    except ImportError:
+        return None
+    if not isinstance(trace.get_tracer_provider(), TracerProvider):
+        return None
+    return trace.get_tracer("krishi_mitra")
+
+
+_tracer = _otel_tracer() if TRACING_ENABLED else None
+_file_lock = threading.Lock()
+
+
+class Span:
+    """One timed stage; use as a context manager via ``span``"""
+
+    def __init__(self, name: str, attributes: dict):
+        parent = _current.get()
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.sampled = parent.sampled if parent else random.random() < TRACE_SAMPLE_RATE
+        self.status = "ok"
+        self._otel = None
+        self._token = None
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+        if self._otel is not None:
+            self._otel.set_attribute(key, value)
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter()
+        if self.sampled and _tracer is not None:
+            from opentelemetry import trace
+
+            context = trace.set_span_in_context(self.parent._otel) if self.parent and self.parent._otel else None
+            self._otel = _tracer.start_span(self.name, context=context, attributes=self.attributes)
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._started
+        self.end_ns = self.start_ns + int(self.duration * 1e9)
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Exited from another context: an async generator closed by a different task
+            _current.set(self.parent)
+        if exc_type is not None:
+            self.status = "error"
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        stage_duration.observe(self.duration, stage=self.name, status=self.status)
+        if self._otel is not None:
+            if exc is not None:
+                self._otel.record_exception(exc)
+            self._otel.end(end_time=self.end_ns)
+        if self.sampled and TRACE_FILE:
+            self._write()
+        return False
+
+    def _write(self):
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+        with _file_lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+
+class _NoopSpan:
+    def set(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NOOP = _NoopSpan()
+
+
+def span(name: str, **attributes):
+    """``with span("tool.get_market_price", crop=crop) as s: ... s.set("rows", n)``"""
+    if not TRACING_ENABLED:
+        return NOOP
+    return Span(name, attributes)
+
+
+def current_span():
+    return _current.get() or NOOP
+
+
+def traced(name: str):
+    """Decorator putting a sync or async function (or async generator) in its own span (a no-op when disabled)"""
+    def decorate(func):
+        if not TRACING_ENABLED:
+            return func
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def agen_wrapper(*args, **kwargs):
+                # The span covers the whole iteration, but is only current while the
+                # generator runs: the caller gets its own span back at every yield
+                items = func(*args, **kwargs)
+                with span(name) as current:
+                    try:
+                        async for item in items:
+                            _current.set(current.parent)
+                            yield item
+                            _current.set(current)
+                    finally:
+                        await items.aclose()
+            return agen_wrapper
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# -------------------------------
+# Recorders
+# -------------------------------
+def record_llm(stage: str, messages, response):
+    """Prompt size and token usage of one LLM call, on the current span and the counters"""
+    if not TRACING_ENABLED:
+        return
+    prompt_chars = sum(len(str(getattr(m, "content", m))) for m in messages)
+    usage = getattr(response, "usage_metadata", None) or {}
+    s = current_span()
+    s.set("llm.prompt_chars", prompt_chars)
+    s.set("llm.prompt_messages", len(messages))
+    for kind in ("input_tokens", "output_tokens"):
+        if kind in usage:
+            s.set(f"llm.{kind}", usage[kind])
+            llm_tokens.inc(usage[kind], stage=stage, kind=kind)
+
+
+def record_cache(cache: str, hit: bool):
+    if not TRACING_ENABLED:
+        return
+    result = "hit" if hit else "miss"
+    cache_events.inc(cache=cache, result=result)
+    current_span().set(f"cache.{cache}", result)
+
+
+def record_http(upstream: str, status):
+    if not TRACING_ENABLED:
+        return
+    upstream_responses.inc(upstream=upstream, status=status)
+    current_span().set("http.status_code", status)
@@ -1,19 +1,37 @@
 import requests
+import httpx
 import os
+import re
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from . import http_client
+from .admission import Overloaded, limiters, request_deadline
+from .tracing import record_cache, traced
+from .tts_cache import CANNED_PHRASES, audio_cache
+
 load_dotenv()
-ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY").strip()
+ELEVENLABS_API_KEY = (os.getenv("ELEVENLABS_API_KEY") or "").strip()
 model = "eleven_multilingual_v2"
+ELEVENLABS_BASE_URL = os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io").rstrip("/")
+VOICE_SETTINGS = {
+    "stability": 0.75,
+    "similarity_boost": 0.75
+}
 
+TTS_PARALLELISM = int(os.getenv("TTS_PARALLELISM", "3"))
+
+# Sentence ends: Latin punctuation followed by space, or the Hindi danda / double danda
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|(?<=[।॥])\s*")
 
-def text_to_speech(text, voice_id="EXAVITQu4vr4xnSDxMaL"): 
-    """Generates speech using ElevenLabs and returns audio bytes."""
-    if not ELEVENLABS_API_KEY:
-        print("ElevenLabs API key not set.")
-        return None 
 
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+
+def _tts_request(text, voice_id, stream=False):
+    url = f"{ELEVENLABS_BASE_URL}/v1/text-to-speech/{voice_id}"
+    if stream:
+        url += "/stream"
     headers = {
         "Accept": "audio/mpeg",
         "xi-api-key": ELEVENLABS_API_KEY,
@@ -21,25 +39,230 @@ def text_to_speech(text, voice_id="EXAVITQu4vr4xnSDxMaL"):
     }
     payload = {
         "text": text,
-        "model_id": model, 
-        "voice_settings": {
-            "stability": 0.75,      
-            "similarity_boost": 0.75 
-        }
+        "model_id": model,
+        "voice_settings": VOICE_SETTINGS
     }
+    return url, headers, payload
+
+
+def _cache_key(text, voice_id):
+    return audio_cache.key(text, voice_id, model, VOICE_SETTINGS)
+
+
+@traced("tts")
+def text_to_speech(text, voice_id="EXAVITQu4vr4xnSDxMaL"): 
+    """Generates speech using ElevenLabs and returns audio bytes."""
+    key = _cache_key(text, voice_id)
+    cached = audio_cache.get(key)
+    record_cache("tts", cached is not None)
+    if cached is not None:
+        return cached
+    if not ELEVENLABS_API_KEY:
+        print("ElevenLabs API key not set.")
+        return None 
+
+    url, headers, payload = _tts_request(text, voice_id)
     try:
-        response = requests.post(url, headers=headers, json=payload, stream=True) # Use stream=True for potentially large audio
+        with limiters["elevenlabs"].sync_slot(request_deadline.get()):
+            response = http_client.session("elevenlabs").post(url, headers=headers, json=payload)
         response.raise_for_status() 
+        audio_cache.put(key, response.content)
         return response.content 
         # ---
 
+    except Overloaded as e:
+        # Queue full, deadline passed or circuit open: no request was made
+        print(f"❌ ElevenLabs skipped: {e}")
+        return None
     except requests.exceptions.RequestException as e:
-        try:
-             error_details = response.json()
-             print("Error details:", error_details)
-        except:
-             print("Response content:", response.text)
+        print(f"❌ ElevenLabs request failed: {e}")
+        if e.response is not None:  # no response at all after a connection error
+            try:
+                 print("Error details:", e.response.json())
+            except ValueError:
+                 print("Response content:", e.response.text)
         return None 
+
+
+def get_async_client() -> httpx.AsyncClient:
+    return http_client.async_client("elevenlabs")
+
+
+@traced("tts")
+async def atext_to_speech(text, voice_id="EXAVITQu4vr4xnSDxMaL"):
+    """Async text_to_speech for the serving layer, returns audio bytes or None."""
+    key = _cache_key(text, voice_id)
+    cached = audio_cache.get(key)
+    record_cache("tts", cached is not None)
+    if cached is not None:
+        return cached
+    if not ELEVENLABS_API_KEY:
+        print("ElevenLabs API key not set.")
+        return None
+
+    url, headers, payload = _tts_request(text, voice_id)
+    try:
+        async with limiters["elevenlabs"].slot(request_deadline.get()):
+            response = await get_async_client().post(url, headers=headers, json=payload)
+        response.raise_for_status()
+        audio_cache.put(key, response.content)
+        return response.content
+    except httpx.HTTPError as e:
+        print(f"ElevenLabs request failed: {e}")
+        return None
+
+
+def split_sentences(text, min_chars=30, max_chars=250):
+    """Split an answer into TTS chunks at sentence (and danda) boundaries.
+
+    The first chunk is left as short as possible so audio starts early;
+    later fragments shorter than ``min_chars`` are merged into their
+    neighbour (the one before or the one after, so a short closing line is
+    not a request of its own), and anything over ``max_chars`` is cut at the
+    last space.
+    """
+    pieces = [p.strip() for p in SENTENCE_BOUNDARY.split(text or "") if p and p.strip()]
+    chunks = []
+    for piece in pieces:
+        while len(piece) > max_chars:
+            cut = piece.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            chunks.append(piece[:cut].strip())
+            piece = piece[cut:].strip()
+        if not piece:
+            continue
+        short = len(piece) < min_chars or (len(chunks) > 1 and len(chunks[-1]) < min_chars)
+        if len(chunks) > 1 and short and len(chunks[-1]) + len(piece) < max_chars:
+            chunks[-1] = f"{chunks[-1]} {piece}"
+        else:
+            chunks.append(piece)
+    # A short last chunk rides along with the one before, even the first
+    if len(chunks) == 2 and len(chunks[-1]) < min_chars and len(chunks[0]) + len(chunks[1]) < max_chars:
+        chunks[-2:] = [f"{chunks[-2]} {chunks[-1]}"]
+    return chunks
+
+
+def _stream_chunk(text, voice_id):
+    # Sentences are cached on their own, so recurring lines are reused across different answers
+    key = _cache_key(text, voice_id)
+    cached = audio_cache.get(key)
+    record_cache("tts", cached is not None)
+    if cached is not None:
+        yield cached
+        return
+    url, headers, payload = _tts_request(text, voice_id, stream=True)
+    blocks = []
+    # One limiter slot per ElevenLabs request, so parallel sentences are all counted
+    with limiters["elevenlabs"].sync_slot(request_deadline.get()), \
+            http_client.session("elevenlabs").post(url, headers=headers, json=payload, stream=True) as response:
+        response.raise_for_status()
+        for block in response.iter_content(chunk_size=4096):
+            if block:
+                blocks.append(block)
+                yield block
+    audio_cache.put(key, b"".join(blocks))
+
+
+def _synthesize_chunk(text, voice_id):
+    return b"".join(_stream_chunk(text, voice_id))
+
+
+def text_to_speech_stream(text, voice_id="EXAVITQu4vr4xnSDxMaL", parallelism=None):
+    """Yield MP3 bytes sentence by sentence as ElevenLabs produces them.
+
+    The first sentence is forwarded block by block while up to
+    ``parallelism - 1`` of the following sentences synthesise in the
+    background; those are yielded in order as soon as their turn comes.
+    """
+    if not ELEVENLABS_API_KEY:
+        print("ElevenLabs API key not set.")
+        return
+    chunks = split_sentences(text)
+    if not chunks:
+        return
+    parallelism = max(1, parallelism or TTS_PARALLELISM)
+
+    with ThreadPoolExecutor(max_workers=parallelism) as pool:
+        pending = deque()
+        next_index = 1
+
+        def fill():
+            nonlocal next_index
+            while next_index < len(chunks) and len(pending) < parallelism - 1:
+                pending.append(pool.submit(_synthesize_chunk, chunks[next_index], voice_id))
+                next_index += 1
+
+        fill()
+        yield from _stream_chunk(chunks[0], voice_id)
+        while pending or next_index < len(chunks):
+            if not pending:
+                # parallelism == 1: stream the next sentence directly
+                yield from _stream_chunk(chunks[next_index], voice_id)
+                next_index += 1
+                continue
+            audio = pending.popleft().result()
+            fill()
+            yield audio
+
+
+async def _astream_chunk(text, voice_id):
+    key = _cache_key(text, voice_id)
+    cached = audio_cache.get(key)
+    record_cache("tts", cached is not None)
+    if cached is not None:
+        yield cached
+        return
+    url, headers, payload = _tts_request(text, voice_id, stream=True)
+    blocks = []
+    async with limiters["elevenlabs"].slot(request_deadline.get()), \
+            get_async_client().stream("POST", url, headers=headers, json=payload) as response:
+        response.raise_for_status()
+        async for block in response.aiter_bytes():
+            if block:
+                blocks.append(block)
+                yield block
+    audio_cache.put(key, b"".join(blocks))
+
+
+async def _asynthesize_chunk(text, voice_id, semaphore):
+    async with semaphore:
+        return b"".join([block async for block in _astream_chunk(text, voice_id)])
+
+
+async def atext_to_speech_stream(text, voice_id="EXAVITQu4vr4xnSDxMaL", parallelism=None):
+    """Async iterator version of text_to_speech_stream for the serving layer"""
+    if not ELEVENLABS_API_KEY:
+        print("ElevenLabs API key not set.")
+        return
+    chunks = split_sentences(text)
+    if not chunks:
+        return
+    parallelism = max(1, parallelism or TTS_PARALLELISM)
+
+    # The first sentence streams live; the rest share parallelism - 1 background slots
+    semaphore = asyncio.Semaphore(max(1, parallelism - 1))
+    tasks = [asyncio.create_task(_asynthesize_chunk(chunk, voice_id, semaphore)) for chunk in chunks[1:]]
+    try:
+        async for block in _astream_chunk(chunks[0], voice_id):
+            yield block
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def prewarm(phrases=None, voice_id="EXAVITQu4vr4xnSDxMaL"):
+    """Synthesise canned phrases (whole and per sentence) that are not cached yet.
+
+    Returns how many clips had to be fetched from ElevenLabs.
+    """
+    fetched = 0
+    for phrase in phrases or CANNED_PHRASES:
+        for text in dict.fromkeys([phrase, *split_sentences(phrase)]):
+            if audio_cache.get(_cache_key(text, voice_id)) is None and text_to_speech(text, voice_id):
+                fetched += 1
+    return fetched
     
    
     
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import threading
+
+from .cache import TTLCache
+
+# Replies that recur verbatim (fallbacks and error messages from main.py)
+CANNED_PHRASES = [
+    "मुझे खुशी होगी आपकी मदद करने में।",
+    "I'd be happy to help you with farming questions.",
+    "I found some information but had trouble formatting it.",
+    "Error processing request",
+]
+
+
+class AudioCache:
+    """Content-addressed MP3 cache: a small in-memory LRU over a size-capped directory.
+
+    Files are named by the SHA-256 of text, voice, model and voice settings.
+    Disk hits refresh the file's mtime, and when the directory grows past
+    ``max_bytes`` the least recently used files are deleted first.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, memory_items: int = 128):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory = TTLCache(maxsize=memory_items, ttl=0)
+        self.disk_hits = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in self._entries())
+
+    @staticmethod
+    def key(text: str, voice_id: str, model: str, voice_settings: dict) -> str:
+        payload = json.dumps(
+            {"text": text, "voice_id": voice_id, "model": model, "voice_settings": voice_settings},
+            sort_keys=True, ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _entries(self):
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith(".mp3")]
+
+    def get(self, key: str):
+        audio = self.memory.get(key)
+        if audio is not None:
+            return audio
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            os.utime(path)  # LRU order on disk is mtime order
+        except OSError:
+            return None
+        self.disk_hits += 1
+        self.memory.set(key, audio)
+        return audio
+
+    def put(self, key: str, audio: bytes):
+        if not audio:
+            return
+        self.memory.set(key, audio)
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        with self._lock:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self._size += len(audio) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Oldest first, down to 90% of the cap so eviction doesn't run on every write
+        for entry in sorted(self._entries(), key=lambda e: e.stat().st_mtime):
+            if self._size <= self.max_bytes * 0.9:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self._size -= size
+            except OSError:
+                continue
+            self.memory.delete(entry.name[:-len(".mp3")])
+
+    def stats(self) -> dict:
+        return {**self.memory.stats(), "disk_hits": self.disk_hits, "disk_bytes": self._size}
+
+
+audio_cache = AudioCache(
+    directory=os.getenv("TTS_CACHE_DIR", "tts_cache"),
+    max_bytes=int(float(os.getenv("TTS_CACHE_MAX_MB", "500")) * 1024 * 1024),
+    memory_items=int(os.getenv("TTS_CACHE_MEMORY_ITEMS", "128")),
+)
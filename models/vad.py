@@ -0,0 +1,73 @@
+import io
+import os
+from pathlib import Path
+
+from pydub import AudioSegment, silence
+
+MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "700"))
+# Anything this many dB below the recording's average loudness counts as silence
+SILENCE_OFFSET_DB = float(os.getenv("VAD_SILENCE_OFFSET_DB", "16"))
+KEEP_SILENCE_MS = int(os.getenv("VAD_KEEP_SILENCE_MS", "200"))
+CHUNK_SECONDS = float(os.getenv("STT_CHUNK_SECONDS", "30"))
+# Step of the loudness scan; pydub's default of 1 ms costs seconds of CPU on a long note
+SEEK_STEP_MS = int(os.getenv("VAD_SEEK_STEP_MS", "10"))
+
+
+def load_audio(source) -> AudioSegment:
+    """Decode a voice note from bytes, a file-like object or a path"""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    elif isinstance(source, Path):
+        source = str(source)
+    return AudioSegment.from_file(source)
+
+
+def speech_segments(audio: AudioSegment) -> list:
+    """(start_ms, end_ms) of the voiced parts, padded and with overlaps merged"""
+    if audio.dBFS == float("-inf"):
+        return []
+    ranges = silence.detect_nonsilent(
+        audio,
+        min_silence_len=MIN_SILENCE_MS,
+        silence_thresh=audio.dBFS - SILENCE_OFFSET_DB,
+        seek_step=SEEK_STEP_MS,
+    )
+    segments = []
+    for start, end in ranges:
+        start = max(0, start - KEEP_SILENCE_MS)
+        end = min(len(audio), end + KEEP_SILENCE_MS)
+        if segments and start <= segments[-1][1]:
+            segments[-1] = (segments[-1][0], end)
+        else:
+            segments.append((start, end))
+    return segments
+
+
+def split_speech(audio: AudioSegment, chunk_seconds: float = None) -> list:
+    """Drop the pauses and pack the speech into chunks of at most ``chunk_seconds``.
+
+    Chunks are cut at pauses where possible; a single utterance longer than
+    the limit is cut at the limit.
+    """
+    max_ms = int((chunk_seconds or CHUNK_SECONDS) * 1000)
+    # Whisper gets 16 kHz mono anyway, and the silence scan is far cheaper on it
+    audio = audio.set_frame_rate(16000).set_channels(1)
+    chunks = []
+    current = AudioSegment.empty()
+    for start, end in speech_segments(audio):
+        for offset in range(start, end, max_ms):
+            piece = audio[offset:min(end, offset + max_ms)]
+            if len(current) and len(current) + len(piece) > max_ms:
+                chunks.append(current)
+                current = AudioSegment.empty()
+            current += piece
+    if len(current):
+        chunks.append(current)
+    return chunks
+
+
+def to_flac(audio: AudioSegment) -> bytes:
+    # 16 kHz mono FLAC is what Whisper works at internally, and lossless at a fraction of the size
+    buffer = io.BytesIO()
+    audio.set_frame_rate(16000).set_channels(1).export(buffer, format="flac")
+    return buffer.getvalue()
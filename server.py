@@ -0,0 +1,220 @@
+"""ASGI service for the voice pipeline: audio in/audio out plus a text endpoint.
+
+    uvicorn server:app --host 0.0.0.0 --port 8000
+
+Every upstream (Groq for STT and the chatbot, ElevenLabs for TTS,
+Data.gov.in for the price sync) sits behind a Limiter from
+models.admission: bounded concurrency, a bounded wait queue and a per
+request deadline. Requests that cannot be served in time are shed with 503
+instead of piling up. Upstream base URLs come from GROQ_BASE_URL,
+ELEVENLABS_BASE_URL and DATA_GOV_API_URL, so the service can run against
+local stub servers.
+"""
+import asyncio
+import base64
+import binascii
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
+
+from main import aget_response, astream_response
+from models import http_client
+from models.tracing import TRACING_ENABLED, render_metrics, span
+from models import (
+    DeadlineExceeded, Overloaded, aspeech_to_text, aspeech_to_text_chunked, atext_to_speech, atext_to_speech_stream, audio_cache, inference_pool, limiters,
+    prewarm_tts, register_upload, request_deadline,
+)
+from utils import response_cache, warm_up
+
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "30"))
+MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES", str(25 * 1024 * 1024)))
+TTS_PREWARM = os.getenv("TTS_PREWARM", "1") == "1"
+# Trim pauses and transcribe long voice notes in parallel chunks (needs ffmpeg for pydub)
+STT_CHUNKED = os.getenv("STT_CHUNKED", "1") == "1"
+# Tools whose dependencies load at startup instead of on first call ("all" or comma-separated names)
+WARM_TOOLS = os.getenv("WARM_TOOLS", "")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if inference_pool.enabled:
+        # Before anything below starts a thread: the workers fork from this process
+        inference_pool.start()
+    if TTS_PREWARM:
+        # Fill the audio cache with the canned replies without holding up startup
+        app.state.tts_prewarm = asyncio.create_task(asyncio.to_thread(prewarm_tts))
+    if WARM_TOOLS:
+        names = None if WARM_TOOLS == "all" else [n.strip() for n in WARM_TOOLS.split(",") if n.strip()]
+        app.state.tool_warm_up = asyncio.create_task(asyncio.to_thread(warm_up, names))
+    yield
+    inference_pool.shutdown()
+
+
+app = FastAPI(title="Krishi Mitra", lifespan=lifespan)
+
+
+class ChatRequest(BaseModel):
+    transcript: str
+    language: str = "English"
+    session_id: str = "default"
+    image_base64: Optional[str] = None
+
+
+class ChatResponse(BaseModel):
+    response: str
+    session_id: str
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(status_code=503, content={"error": str(exc)}, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_handler(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=504, content={"error": str(exc)})
+
+
+def remaining(deadline: float) -> float:
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
+    return left
+
+
+async def within_deadline(what: str, deadline: float, coro):
+    """Await work whose upstream calls take their own limiter slots, within the request deadline"""
+    request_deadline.set(deadline)
+    try:
+        return await asyncio.wait_for(coro, remaining(deadline))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"{what} was not ready in time")
+
+
+def decode_image(image_base64: Optional[str]) -> Optional[bytes]:
+    if not image_base64:
+        return None
+    try:
+        return base64.b64decode(image_base64, validate=True)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="image_base64 is not valid base64")
+
+
+def with_image(transcript: str, image: Optional[bytes]) -> str:
+    # The disease tool reads uploads by handle, so the photo never goes through the LLM
+    if not image:
+        return transcript
+    handle = register_upload(image)
+    return f"{transcript}\n\n[The farmer attached a photo: {handle}]"
+
+
+async def answer(transcript: str, language: str, session_id: str, deadline: float) -> str:
+    # Each LLM call in the turn takes its own Groq slot (see main.acall_llm)
+    return await within_deadline("The answer", deadline, aget_response(transcript, language, session_id))
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest):
+    deadline = time.monotonic() + REQUEST_DEADLINE
+    transcript = with_image(request.transcript, decode_image(request.image_base64))
+    text = await answer(transcript, request.language, request.session_id, deadline)
+    return ChatResponse(response=text, session_id=request.session_id)
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Like /chat, but the answer text is streamed as the model writes it"""
+    deadline = time.monotonic() + REQUEST_DEADLINE
+    transcript = with_image(request.transcript, decode_image(request.image_base64))
+
+    async def deltas():
+        # Each LLM call takes its own Groq slot inside the generator, so nothing
+        # is held if the client goes away before the body is read
+        request_deadline.set(deadline)
+        async for delta in astream_response(transcript, request.language, request.session_id):
+            yield delta
+
+    return StreamingResponse(deltas(), media_type="text/plain; charset=utf-8")
+
+
+async def voice_answer(audio: UploadFile, image: Optional[UploadFile], session_id: str, deadline: float) -> str:
+    audio_bytes = await audio.read()
+    if len(audio_bytes) > MAX_AUDIO_BYTES:
+        raise HTTPException(status_code=413, detail="Audio file too large")
+    image_bytes = await image.read() if image is not None else None
+
+    transcribe = aspeech_to_text_chunked if STT_CHUNKED else aspeech_to_text
+    # Each transcription request (one per chunk) takes its own Groq slot
+    document = await within_deadline(
+        "Transcription", deadline, transcribe(audio_bytes, audio.filename or "audio.mp3")
+    )
+    transcript = with_image(document.page_content, image_bytes)
+    language = document.metadata["language"]
+    return await answer(transcript, language, session_id, deadline)
+
+
+@app.post("/voice")
+async def voice(
+    audio: UploadFile = File(...),
+    image: Optional[UploadFile] = File(None),
+    session_id: str = Form("default"),
+):
+    """Farmer's voice note in, spoken answer (audio/mpeg) out"""
+    deadline = time.monotonic() + REQUEST_DEADLINE
+    with span("request.voice", session_id=session_id):
+        text = await voice_answer(audio, image, session_id, deadline)
+        # atext_to_speech takes the ElevenLabs slot itself (after the audio cache)
+        speech = await within_deadline("Text-to-speech", deadline, atext_to_speech(text))
+    if not speech:
+        raise HTTPException(status_code=502, detail="Text-to-speech failed")
+    return Response(content=speech, media_type="audio/mpeg")
+
+
+@app.post("/voice/stream")
+async def voice_stream(
+    audio: UploadFile = File(...),
+    image: Optional[UploadFile] = File(None),
+    session_id: str = Form("default"),
+):
+    """Like /voice, but the MP3 is streamed sentence by sentence as it is synthesised"""
+    deadline = time.monotonic() + REQUEST_DEADLINE
+    with span("request.voice_stream", session_id=session_id):
+        text = await voice_answer(audio, image, session_id, deadline)
+
+    async def audio_chunks():
+        # Every sentence request takes its own ElevenLabs slot inside atext_to_speech_stream
+        request_deadline.set(deadline)
+        async for block in atext_to_speech_stream(text):
+            yield block
+
+    return StreamingResponse(audio_chunks(), media_type="audio/mpeg")
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "limiters": {name: limiter.stats() for name, limiter in limiters.items()},
+        "response_cache": response_cache.stats(),
+        "tts_cache": audio_cache.stats(),
+        "circuit_breakers": http_client.stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint (empty unless TRACING=1)"""
+    if not TRACING_ENABLED:
+        return PlainTextResponse("# tracing disabled, set TRACING=1\n")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", "8000")))
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+httpx = pytest.importorskip("httpx")
+
+from models import http_client  # noqa: E402
+
+
+class HangingTransport(httpx.AsyncBaseTransport):
+    async def handle_async_request(self, request):
+        await asyncio.sleep(60)
+
+
+class OkTransport(httpx.AsyncBaseTransport):
+    async def handle_async_request(self, request):
+        return httpx.Response(200, request=request)
+
+
+def half_open_transport(inner) -> http_client.AsyncRetryTransport:
+    upstream = http_client.Upstream("test", 1, 1, 1, max_retries=0, breaker_failures=1, breaker_reset=30)
+    upstream.breaker.failures = 1
+    upstream.breaker.opened_at = time.monotonic() - 60
+    transport = http_client.AsyncRetryTransport(upstream)
+    transport._transport = inner
+    return transport
+
+
+def test_cancelled_trial_reopens_the_breaker():
+    transport = half_open_transport(HangingTransport())
+    breaker = transport.upstream.breaker
+    request = httpx.Request("POST", "http://upstream.test/v1")
+    assert breaker.state == "half_open"
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(transport.handle_async_request(request), 0.05))
+
+    assert not breaker.trial_running
+    assert breaker.state == "open"
+
+    # Once the reset timeout passes again, a new trial is let through and closes it
+    breaker.opened_at = time.monotonic() - 60
+    transport._transport = OkTransport()
+    response = asyncio.run(transport.handle_async_request(request))
+    assert response.status_code == 200
+    assert breaker.state == "closed"
+
+
+def test_other_errors_do_not_count_outside_the_trial():
+    breaker = http_client.CircuitBreaker("test", failure_threshold=1)
+    breaker.abandon(breaker.before_call())
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("bs4")
+pytest.importorskip("requests")
+pytest.importorskip("httpx")
+
+from models import schemes  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+BASE_URL = "https://www.myscheme.gov.in/search"
+
+
+def fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class FakeFetcher:
+    def __init__(self, html: str):
+        self.html = html
+        self.links = []
+
+    def __call__(self, link: str) -> dict:
+        self.links.append(link)
+        return schemes.parse_detail(self.html)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves the search page at /search and the detail page under /schemes/"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/search"):
+            body = fixture("myscheme_search.html")
+        elif self.path.startswith("/schemes/"):
+            body = fixture("myscheme_detail.html")
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def fixture_site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    yield f"http://{host}:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+def read_lines(path) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_parse_cards():
+    cards = schemes.parse_cards(fixture("myscheme_search.html"), BASE_URL)
+    assert [card["link"] for card in cards] == [
+        "https://www.myscheme.gov.in/schemes/pm-kisan",
+        "https://www.myscheme.gov.in/schemes/pmfby",
+    ]
+    assert cards[0]["title"] == "Pradhan Mantri Kisan Samman Nidhi"
+    assert cards[0]["ministry"] == "Ministry of Agriculture and Farmers Welfare"
+    assert cards[0]["description"].startswith("Income support")
+    assert cards[1]["description"] is None
+
+
+def test_parse_detail():
+    detail = schemes.parse_detail(fixture("myscheme_detail.html"))
+    assert detail["details"] == "Financial benefit of ₹6,000 per year\nPaid in three instalments"
+    assert detail["eligibility"] == "Landholding farmer families"
+    assert detail["documents_required"] is None
+
+
+def test_scrape_resumes_and_compacts(tmp_path):
+    checkpoint = str(tmp_path / "schemes.jsonl")
+    cards = schemes.parse_cards(fixture("myscheme_search.html"), BASE_URL)
+    fetch = FakeFetcher(fixture("myscheme_detail.html"))
+
+    # An interrupted run left the first scheme behind
+    schemes.scrape(cards[:1], fetch, checkpoint, workers=2)
+    records = schemes.scrape(cards, fetch, checkpoint, workers=2)
+    assert fetch.links == [cards[0]["link"], cards[1]["link"]]
+    assert {r["link"] for r in records} == {c["link"] for c in cards}
+
+    # A fresh, unchanged card is not fetched again
+    schemes.scrape(cards, fetch, checkpoint, workers=2)
+    assert len(fetch.links) == 2
+    assert len(read_lines(checkpoint)) == 2
+
+
+def test_detail_change_is_picked_up_when_stale(tmp_path):
+    checkpoint = str(tmp_path / "schemes.jsonl")
+    cards = schemes.parse_cards(fixture("myscheme_search.html"), BASE_URL)[:1]
+    schemes.scrape(cards, FakeFetcher(fixture("myscheme_detail.html")), checkpoint)
+    first = read_lines(checkpoint)[0]
+
+    # Same card, edited detail page, checkpoint older than max_age
+    first["scraped_at"] = time.time() - 30 * schemes.DAY
+    with open(checkpoint, "w", encoding="utf-8") as f:
+        f.write(json.dumps(first) + "\n")
+    edited = fixture("myscheme_detail.html").replace("three instalments", "four instalments")
+    records = schemes.scrape(cards, FakeFetcher(edited), checkpoint, max_age_days=7)
+
+    assert records[0]["details"].endswith("four instalments")
+    assert records[0]["hash"] != first["hash"]
+    assert records[0]["card_hash"] == first["card_hash"]
+    assert len(read_lines(checkpoint)) == 1
+
+
+def test_http_fetcher_against_local_site(tmp_path, fixture_site):
+    fetch = schemes.HttpFetcher(timeout=5)
+    cards = schemes.collect_cards_http(f"{fixture_site}/search", "kisan", fetch.session, timeout=5)
+    assert [card["link"] for card in cards] == [
+        f"{fixture_site}/schemes/pm-kisan",
+        f"{fixture_site}/schemes/pmfby",
+    ]
+
+    records = schemes.scrape(cards, fetch, str(tmp_path / "schemes.jsonl"), workers=2)
+    fetch.close()
+    assert {r["eligibility"] for r in records} == {"Landholding farmer families"}
+
+    # close() leaves the shared pooled session usable
+    assert fetch.session.get(f"{fixture_site}/search", timeout=5).status_code == 200
@@ -1,3 +1,7 @@
 from .llm import Base_llm
-from .prompts import generate_1_res_prompt
-from .tools import tools
\ No newline at end of file
+from .prompts import generate_1_res_prompt, tool_system_prompt
+from .tools import tools, warm_up
+from .response_cache import history_fingerprint, response_cache
+from .tool_executor import run_tool_calls, arun_tool_calls
+from .memory import memory
+from .json_stream import ResponseFieldExtractor
\ No newline at end of file
@@ -0,0 +1,74 @@
+import re
+
+RESPONSE_KEY = re.compile(r'"response"\s*:\s*"')
+ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class ResponseFieldExtractor:
+    """Pulls the text of the "response" field out of a JSON answer as it streams in.
+
+    ``feed`` takes the next piece of model output and returns the newly
+    decoded characters of the field (escapes resolved, even when split across
+    chunks). Output that does not start like JSON is passed through as is,
+    since the answer prompts fall back to plain text now and then, unless
+    ``plain_text`` is False (a tool-bound call may chat before its tool call).
+    """
+
+    def __init__(self, plain_text: bool = True):
+        self.plain_text = plain_text
+        self.buffer = ""
+        self.state = "seek"  # seek -> string -> done, or seek -> passthrough
+        self._escape = None
+        self._high_surrogate = None
+
+    def feed(self, chunk: str) -> str:
+        if not chunk:
+            return ""
+        if self.state == "passthrough":
+            return chunk
+        if self.state == "seek":
+            self.buffer += chunk
+            start = self.buffer.lstrip()
+            if start and start[0] not in "{`" and self.plain_text:
+                self.state = "passthrough"
+                return self.buffer
+            match = RESPONSE_KEY.search(self.buffer)
+            if not match:
+                return ""
+            self.state = "string"
+            chunk = self.buffer[match.end():]
+        if self.state == "string":
+            return self._decode(chunk)
+        return ""
+
+    def _decode(self, chunk: str) -> str:
+        out = []
+        for ch in chunk:
+            if self.state != "string":
+                break
+            if self._escape is not None:
+                self._escape += ch
+                if self._escape[0] == "u":
+                    if len(self._escape) == 5:
+                        out.append(self._code_point(int(self._escape[1:], 16)))
+                        self._escape = None
+                    continue
+                out.append(ESCAPES.get(self._escape, self._escape))
+                self._escape = None
+            elif ch == "\\":
+                self._escape = ""
+            elif ch == '"':
+                self.state = "done"
+            else:
+                out.append(ch)
+        return "".join(out)
+
+    def _code_point(self, value: int) -> str:
+        # 🌾 style pairs arrive as two escapes
+        if 0xD800 <= value < 0xDC00:
+            self._high_surrogate = value
+            return ""
+        if 0xDC00 <= value < 0xE000 and self._high_surrogate is not None:
+            value = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (value - 0xDC00)
+            self._high_surrogate = None
+        return chr(value)
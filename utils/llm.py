@@ -2,6 +2,8 @@ from langchain_groq import ChatGroq
 from dotenv import load_dotenv
 import os
 
+from models import http_client
+
 load_dotenv()
 
 GROQ_API_KEY=os.getenv("GROQ_API_KEY")
@@ -9,5 +11,11 @@ GROQ_API_KEY=os.getenv("GROQ_API_KEY")
 Base_llm = ChatGroq(
     api_key=GROQ_API_KEY,
     model="openai/gpt-oss-120b",
-    temperature=0.5
+    base_url=os.getenv("GROQ_BASE_URL"),
+    temperature=0.5,
+    # Retries happen in the shared transport, which knows the circuit breaker
+    max_retries=0,
+    timeout=http_client.upstreams["groq"].httpx_timeout,
+    http_client=http_client.client("groq"),
+    http_async_client=http_client.async_client("groq"),
 )
\ No newline at end of file
@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+MAX_TURNS = int(os.getenv("MEMORY_MAX_TURNS", "20"))
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for ASCII; the tokenizer spends about one token per
+    # Devanagari (or other non-ASCII) character, so those are counted one for one
+    text = str(text or "")
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    ascii_chars = len(text) - non_ascii
+    return max(ascii_chars // 4 + non_ascii, len(text.split())) + 1
+
+
+class InMemoryBackend:
+    def __init__(self):
+        self._sessions = {}
+
+    def turns(self, session_id: str) -> list:
+        session = self._sessions.get(session_id)
+        return list(session["turns"]) if session else []
+
+    def append(self, session_id: str, question: str, answer: str, now: float):
+        session = self._sessions.setdefault(session_id, {"turns": deque(maxlen=MAX_TURNS), "last_seen": now})
+        session["turns"].append((question, answer))
+        session["last_seen"] = now
+
+    def touch(self, session_id: str, now: float):
+        if session_id in self._sessions:
+            self._sessions[session_id]["last_seen"] = now
+
+    def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def evict_idle(self, cutoff: float) -> int:
+        idle = [sid for sid, s in self._sessions.items() if s["last_seen"] < cutoff]
+        for sid in idle:
+            del self._sessions[sid]
+        return len(idle)
+
+
+class SQLiteBackend:
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS turns (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT, question TEXT, answer TEXT
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_turns_session ON turns (session_id, id)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, last_seen REAL)")
+
+    def turns(self, session_id: str) -> list:
+        rows = self._conn.execute(
+            "SELECT question, answer FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+            (session_id, MAX_TURNS),
+        ).fetchall()
+        return list(reversed(rows))
+
+    def append(self, session_id: str, question: str, answer: str, now: float):
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO turns (session_id, question, answer) VALUES (?, ?, ?)",
+                (session_id, question, answer),
+            )
+            self._conn.execute(
+                "DELETE FROM turns WHERE session_id = ? AND id NOT IN "
+                "(SELECT id FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                (session_id, session_id, MAX_TURNS),
+            )
+            self.touch(session_id, now)
+
+    def touch(self, session_id: str, now: float):
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO sessions (session_id, last_seen) VALUES (?, ?)",
+                               (session_id, now))
+
+    def delete(self, session_id: str):
+        with self._conn:
+            self._conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def evict_idle(self, cutoff: float) -> int:
+        with self._conn:
+            idle = [row[0] for row in self._conn.execute(
+                "SELECT session_id FROM sessions WHERE last_seen < ?", (cutoff,))]
+            for sid in idle:
+                self.delete(sid)
+        return len(idle)
+
+
+class SessionMemory:
+    """Per-farmer conversation history trimmed to a token budget.
+
+    Only the question and the final answer of each turn are kept; tool calls
+    and raw tool payloads (scheme dumps, price tables) are dropped once the
+    turn is over, since the answer already carries what the farmer was told.
+    """
+
+    def __init__(self, token_budget: int = 1500, idle_ttl: float = 3600, backend=None):
+        self.token_budget = token_budget
+        self.idle_ttl = idle_ttl
+        self.backend = backend or InMemoryBackend()
+        self._lock = threading.Lock()
+        self._last_eviction = time.time()
+
+    def history(self, session_id: str) -> list:
+        """Newest turns that fit in the token budget, as LangChain messages"""
+        with self._lock:
+            turns = self.backend.turns(session_id)
+            self.backend.touch(session_id, time.time())
+
+        kept = []
+        used = 0
+        for question, answer in reversed(turns):
+            cost = estimate_tokens(question) + estimate_tokens(answer)
+            if kept and used + cost > self.token_budget:
+                break
+            kept.append((question, answer))
+            used += cost
+
+        messages = []
+        for question, answer in reversed(kept):
+            messages += [HumanMessage(content=question), AIMessage(content=answer)]
+        return messages
+
+    def append_turn(self, session_id: str, question: str, answer: str):
+        now = time.time()
+        with self._lock:
+            self.backend.append(session_id, question, answer, now)
+            if now - self._last_eviction > 60:
+                self.backend.evict_idle(now - self.idle_ttl)
+                self._last_eviction = now
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self.backend.delete(session_id)
+
+
+def _backend():
+    path = os.getenv("MEMORY_DB_PATH")
+    return SQLiteBackend(path) if path else InMemoryBackend()
+
+
+memory = SessionMemory(
+    token_budget=int(os.getenv("MEMORY_TOKEN_BUDGET", "1500")),
+    idle_ttl=float(os.getenv("MEMORY_IDLE_TTL", "3600")),
+    backend=_backend(),
+)
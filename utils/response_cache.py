@@ -0,0 +1,166 @@
+import hashlib
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from models.cache import TTLCache
+
+DAY = 24 * 60 * 60
+
+# How long an answer stays valid depends on the data the tools fed into it
+TOOL_TTLS = {
+    "get_market_price": DAY,
+    "get_crop_locations": DAY,
+    "search_schemes": 7 * DAY,
+    "Scheme_detials": 7 * DAY,
+    "Find_scheme": 7 * DAY,
+}
+# Answers about an uploaded photo say nothing about the next photo
+UNCACHEABLE_TOOLS = {"detect_crop_disease"}
+# Place names barely move an embedding, so these answers are reused on exact matches only
+EXACT_ONLY_TOOLS = {"get_market_price", "get_crop_locations"}
+DEFAULT_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(3 * DAY)))
+
+
+def normalise_transcript(text: str) -> str:
+    text = unicodedata.normalize("NFC", str(text or "")).lower()
+    text = re.sub(r"[^\w\s\u0900-\u097f]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def history_fingerprint(messages) -> str:
+    """Short hash of the conversation so far; "" for a fresh session"""
+    if not messages:
+        return ""
+    text = "\n".join(f"{getattr(m, 'type', '')}:{normalise_transcript(getattr(m, 'content', m))}" for m in messages)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def cosine(a, b) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def ttl_for(tools_used) -> float:
+    """TTL for an answer built from these tools, None when it must not be cached"""
+    tools_used = set(tools_used or [])
+    if tools_used & UNCACHEABLE_TOOLS:
+        return None
+    ttls = [TOOL_TTLS[name] for name in tools_used if name in TOOL_TTLS]
+    return min(ttls) if ttls else DEFAULT_TTL
+
+
+class ResponseCache:
+    """Final answers keyed on normalised transcript + language + history fingerprint.
+
+    A follow-up ("and in Punjab?") only matches a turn with the same history.
+    The exact tier is a TTL/LRU cache. With an ``embed`` callable, a second
+    tier compares the question's embedding against recent entries of the same
+    language and reuses an answer above ``similarity_threshold``; it only
+    holds fresh-session turns that used no price or location tool.
+    """
+
+    def __init__(self, maxsize: int = 1024, embed=None, similarity_threshold: float = 0.92):
+        self.exact = TTLCache(maxsize=maxsize, ttl=DEFAULT_TTL)
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(transcript: str, language: str, context: str = "") -> str:
+        return f"{str(language or '').strip().lower()}::{context}::{normalise_transcript(transcript)}"
+
+    def get(self, transcript: str, language: str, context: str = ""):
+        key = self.key(transcript, language, context)
+        response = self.exact.peek(key)
+        if response is None and self.embed is not None and not context:
+            response = self._semantic_get(transcript, key)
+            if response is not None:
+                self.semantic_hits += 1
+        elif response is not None:
+            self.hits += 1
+        if response is None:
+            self.misses += 1
+        return response
+
+    def put(self, transcript: str, language: str, response: str, tools_used=(), context: str = ""):
+        ttl = ttl_for(tools_used)
+        if ttl is None or not response:
+            return
+        key = self.key(transcript, language, context)
+        self.exact.set(key, response, ttl=ttl)
+        if self.embed is not None and not context and not set(tools_used or ()) & EXACT_ONLY_TOOLS:
+            vector = self.embed(normalise_transcript(transcript))
+            with self._lock:
+                self._vectors[key] = vector
+                self._vectors.move_to_end(key)
+                while len(self._vectors) > self.exact.maxsize:
+                    self._vectors.popitem(last=False)
+
+    def _semantic_get(self, transcript: str, key: str):
+        language = key.split("::", 1)[0]
+        vector = self.embed(normalise_transcript(transcript))
+        with self._lock:
+            candidates = [(k, v) for k, v in self._vectors.items() if k.split("::", 1)[0] == language]
+
+        best_key, best_score = None, 0.0
+        for candidate_key, candidate in candidates:
+            score = cosine(vector, candidate)
+            if score > best_score:
+                best_key, best_score = candidate_key, score
+        if best_key is None or best_score < self.similarity_threshold:
+            return None
+
+        response = self.exact.peek(best_key)
+        if response is None:
+            # Expired or evicted from the exact tier
+            with self._lock:
+                self._vectors.pop(best_key, None)
+        return response
+
+    def stats(self) -> dict:
+        # One hit, semantic hit or miss per lookup
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            **self.exact.stats(),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+        }
+
+
+def _embedder():
+    """Sentence embedder for the semantic tier, when RESPONSE_CACHE_EMBEDDINGS names a model"""
+    model_name = os.getenv("RESPONSE_CACHE_EMBEDDINGS")
+    if not model_name:
+        return None
+    model = None
+    lock = threading.Lock()
+
+    def embed(text):
+        # The sentence-transformers model is loaded on the first lookup, not at import
+        nonlocal model
+        with lock:
+            if model is None:
+                from langchain_huggingface import HuggingFaceEmbeddings
+
+                model = HuggingFaceEmbeddings(model_name=model_name)
+        return model.embed_query(text)
+
+    return embed
+
+
+response_cache = ResponseCache(
+    maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+    embed=_embedder(),
+    similarity_threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92")),
+)
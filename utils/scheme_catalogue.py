@@ -0,0 +1,124 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import NamedTuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEME_FILES = os.getenv("SCHEME_FILES", "scheme.json,schemea.json,schemeas.json,schemeasd.json")
+
+
+class Scheme(NamedTuple):
+    title: str
+    link: str
+    ministry: str
+    description: str
+    details: str
+    eligibility: str
+    application_process: str
+    documents_required: str
+
+
+def slugify(text: str) -> str:
+    return re.sub(r"[^\w]+", "-", str(text or "").lower()).strip("-")
+
+
+def normalise_link(link: str) -> str:
+    return str(link or "").strip().rstrip("/")
+
+
+class SchemeCatalogue:
+    """All scraped schemes, parsed once and indexed by link and slug.
+
+    The JSON files are re-read only when one of their mtimes changes, and at
+    most every ``check_interval`` seconds is spent on the stat calls.
+    """
+
+    def __init__(self, paths=None, check_interval: float = 2.0):
+        if paths is None:
+            paths = [p.strip() for p in SCHEME_FILES.split(",") if p.strip()]
+        self.paths = [p if os.path.isabs(p) else os.path.join(BASE_DIR, p) for p in paths]
+        self.check_interval = check_interval
+        self.version = 0
+        self._schemes = []
+        self._by_link = {}
+        self._by_slug = {}
+        self._mtimes = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _current_mtimes(self):
+        return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in self.paths)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if self._mtimes is not None and now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            self._last_check = now
+            mtimes = self._current_mtimes()
+            if mtimes != self._mtimes:
+                self._load()
+                self._mtimes = mtimes
+
+    def _load(self):
+        merged = {}
+        for path in self.paths:
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    records = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Skipping scheme file {path}: {e}")
+                continue
+            for record in records:
+                link = normalise_link(record.get("link"))
+                if not link:
+                    continue
+                # Earlier files win, later ones only fill in fields that are missing
+                current = merged.setdefault(link, {})
+                for field in Scheme._fields:
+                    if not current.get(field) and record.get(field):
+                        current[field] = record[field]
+                current["link"] = link
+
+        schemes = [Scheme(**{f: record.get(f) or "" for f in Scheme._fields}) for record in merged.values()]
+        by_link = {s.link: s for s in schemes}
+        by_slug = {}
+        for s in schemes:
+            by_slug.setdefault(slugify(s.title), s)
+            by_slug.setdefault(s.link.rsplit("/", 1)[-1].lower(), s)
+
+        self._schemes, self._by_link, self._by_slug = schemes, by_link, by_slug
+        self.version += 1
+
+    def all(self) -> list:
+        self._maybe_reload()
+        return self._schemes
+
+    def snapshot(self) -> tuple:
+        """(schemes, version) from the same load, after checking the files for changes"""
+        self._maybe_reload()
+        with self._lock:
+            return self._schemes, self.version
+
+    def get(self, key: str):
+        """Look a scheme up by its link, its link slug or its title slug"""
+        self._maybe_reload()
+        scheme = self._by_link.get(normalise_link(key))
+        if scheme is None:
+            scheme = self._by_slug.get(slugify(normalise_link(key).rsplit("/", 1)[-1]))
+        if scheme is None:
+            scheme = self._by_slug.get(slugify(key))
+        return scheme
+
+    def details(self, key: str) -> dict:
+        scheme = self.get(key)
+        if scheme is None:
+            return {"error": f"No scheme found for '{key}'. Use a link returned by search_schemes."}
+        return scheme._asdict()
+
+
+catalogue = SchemeCatalogue()
@@ -0,0 +1,133 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict, namedtuple
+
+from .scheme_catalogue import catalogue as default_catalogue
+
+# Field weights are applied by repeating the field's tokens
+FIELD_WEIGHTS = {"title": 3, "description": 2, "eligibility": 1, "details": 1}
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "is", "are", "be", "by",
+    "with", "as", "at", "from", "that", "this", "it", "i", "me", "my", "we", "you", "your",
+    "can", "any", "there", "what", "which", "how", "do", "does", "get", "have", "has", "some",
+    "will", "would", "should", "about", "into", "under", "their", "its", "also", "such",
+    "hai", "hain", "ka", "ki", "ke", "ko", "se", "me", "mein", "kya", "kaise", "kaun", "koi",
+    "mujhe", "mera", "meri", "aur", "ya", "bhi", "liye", "milega", "milti", "chahiye",
+    "है", "हैं", "का", "की", "के", "को", "से", "में", "क्या", "कैसे", "कौन", "कोई", "मुझे",
+    "मेरा", "मेरी", "और", "या", "भी", "लिए", "मिलेगा", "चाहिए",
+}
+
+# Hindi / Hinglish query words -> English terms used in the scheme text
+QUERY_SYNONYMS = {
+    "kisan": ["farmer"], "किसान": ["kisan", "farmer"],
+    "kheti": ["agriculture", "farming"], "खेती": ["agriculture", "farming"],
+    "paisa": ["financial", "income"], "paise": ["financial", "income"], "पैसा": ["financial", "income"],
+    "beej": ["seed"], "बीज": ["seed"],
+    "khad": ["fertilizer"], "खाद": ["fertilizer"],
+    "bima": ["insurance"], "बीमा": ["insurance"],
+    "karz": ["loan", "credit"], "karza": ["loan", "credit"], "rin": ["loan", "credit"],
+    "कर्ज": ["loan", "credit"], "ऋण": ["loan", "credit"],
+    "sinchai": ["irrigation"], "सिंचाई": ["irrigation"],
+    "machli": ["fish", "fisheries"], "मछली": ["fish", "fisheries"],
+    "पेंशन": ["pension"],
+    "yojana": ["scheme"], "योजना": ["scheme", "yojana"],
+    "zameen": ["land"], "jameen": ["land"], "ज़मीन": ["land"], "जमीन": ["land"],
+    "sadak": ["road"], "सड़क": ["road"],
+    "pm": ["pradhan", "mantri"], "cm": ["chief", "minister", "mukhya", "mantri"],
+}
+
+# Published as one object so a search never mixes two versions of the index
+Index = namedtuple("Index", "schemes postings doc_lengths avg_length")
+EMPTY_INDEX = Index([], {}, [], 0.0)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+|[\u0900-\u097f]+")
+
+
+def tokenize(text: str) -> list:
+    tokens = []
+    for token in TOKEN_RE.findall(str(text or "").lower()):
+        if token in STOPWORDS or len(token) < 2:
+            continue
+        # Cheap plural folding for English ("schemes" -> "scheme")
+        if token.isascii() and len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def expand_query(tokens: list) -> list:
+    expanded = list(tokens)
+    for token in tokens:
+        expanded.extend(QUERY_SYNONYMS.get(token, []))
+    return expanded
+
+
+class SchemeSearch:
+    """BM25 over scheme title, description, eligibility and details.
+
+    The inverted index is rebuilt lazily whenever the catalogue reloads.
+    """
+
+    def __init__(self, catalogue=None, k1: float = 1.5, b: float = 0.75):
+        self.catalogue = catalogue or default_catalogue
+        self.k1 = k1
+        self.b = b
+        self._version = None
+        self._index = EMPTY_INDEX
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build(schemes) -> Index:
+        postings = defaultdict(list)
+        lengths = []
+        for doc_id, scheme in enumerate(schemes):
+            # The link slug (e.g. "pm-kisan") is often how farmers name the scheme
+            tokens = tokenize(scheme.link.rsplit("/", 1)[-1]) * FIELD_WEIGHTS["title"]
+            for field, weight in FIELD_WEIGHTS.items():
+                tokens += tokenize(getattr(scheme, field)) * weight
+            lengths.append(len(tokens))
+            for token, tf in Counter(tokens).items():
+                postings[token].append((doc_id, tf))
+        return Index(schemes, dict(postings), lengths, sum(lengths) / len(lengths) if lengths else 0.0)
+
+    def _ensure_index(self) -> Index:
+        # snapshot() reloads changed scheme files, so this is what notices them
+        schemes, version = self.catalogue.snapshot()
+        if self._version != version:
+            with self._lock:
+                if self._version is None or version > self._version:
+                    self._index = self._build(schemes)
+                    self._version = version
+        return self._index
+
+    def search(self, query: str, k: int = 3) -> list:
+        index = self._ensure_index()
+        n_docs = len(index.schemes)
+        if not n_docs:
+            return []
+
+        scores = defaultdict(float)
+        for token in set(expand_query(tokenize(query))):
+            postings = index.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                norm = 1 - self.b + self.b * index.doc_lengths[doc_id] / index.avg_length
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [
+            {
+                "title": index.schemes[doc_id].title,
+                "link": index.schemes[doc_id].link,
+                "description": index.schemes[doc_id].description,
+                "score": round(score, 3),
+            }
+            for doc_id, score in ranked
+        ]
+
+
+scheme_search = SchemeSearch()
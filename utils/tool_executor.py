@@ -0,0 +1,127 @@
+import asyncio
+import contextvars
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import StructuredTool
+
+from models.tracing import span
+
+# Model inference gets its own small pool so it cannot starve the network-bound tools
+CPU_TOOLS = {"detect_crop_disease"}
+
+TOOL_TIMEOUTS = {
+    "get_market_price": 20,
+    "get_crop_locations": 20,
+    "detect_crop_disease": 30,
+    "search_schemes": 5,
+    "Scheme_detials": 5,
+    "Find_scheme": 5,
+}
+DEFAULT_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "15"))
+
+io_pool = ThreadPoolExecutor(max_workers=int(os.getenv("TOOL_IO_WORKERS", "16")), thread_name_prefix="tool-io")
+cpu_pool = ThreadPoolExecutor(max_workers=int(os.getenv("TOOL_CPU_WORKERS", "2")), thread_name_prefix="tool-cpu")
+
+
+def pool_for(name: str) -> ThreadPoolExecutor:
+    return cpu_pool if name in CPU_TOOLS else io_pool
+
+
+def timeout_for(name: str) -> float:
+    return TOOL_TIMEOUTS.get(name, DEFAULT_TIMEOUT)
+
+
+def with_async(sync_tool: StructuredTool) -> StructuredTool:
+    """Copy of a sync tool whose ainvoke runs it on the right pool under its timeout"""
+    name = sync_tool.name
+
+    async def coroutine(**kwargs):
+        loop = asyncio.get_running_loop()
+        # Copy the context so spans opened inside the tool nest under the caller's
+        context = contextvars.copy_context()
+        future = loop.run_in_executor(pool_for(name), lambda: context.run(sync_tool.func, **kwargs))
+        return await asyncio.wait_for(future, timeout_for(name))
+
+    return StructuredTool.from_function(
+        func=sync_tool.func,
+        coroutine=coroutine,
+        name=name,
+        description=sync_tool.description,
+        args_schema=sync_tool.args_schema,
+    )
+
+
+def _tool_message(call: dict, content, status: str = "success") -> ToolMessage:
+    if not isinstance(content, str):
+        try:
+            content = json.dumps(content, ensure_ascii=False)
+        except (TypeError, ValueError):
+            content = str(content)
+    return ToolMessage(content=content, name=call["name"], tool_call_id=call["id"], status=status)
+
+
+def _error_message(call: dict, error: Exception) -> ToolMessage:
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+        text = f"❌ {call['name']} timed out after {timeout_for(call['name'])}s"
+    else:
+        text = f"❌ Error: {error}"
+    return _tool_message(call, text, status="error")
+
+
+def _invoke(selected: StructuredTool, args: dict):
+    with span(f"tool.{selected.name}"):
+        return selected.invoke(args)
+
+
+def run_tool_calls(tool_calls: list, tools: list) -> list:
+    """Run all tool calls of one turn concurrently, results in call order.
+
+    A call that exceeds its timeout is reported as an error message; its
+    thread cannot be killed, but the turn no longer waits for it.
+    """
+    tools_by_name = {t.name: t for t in tools}
+    started = time.monotonic()
+    futures = []
+    for call in tool_calls:
+        selected = tools_by_name.get(call["name"])
+        if selected is None:
+            futures.append((call, None))
+            continue
+        context = contextvars.copy_context()
+        futures.append((call, pool_for(call["name"]).submit(context.run, _invoke, selected, call["args"])))
+
+    messages = []
+    for call, future in futures:
+        if future is None:
+            messages.append(_tool_message(call, f"❌ Unknown tool '{call['name']}'", status="error"))
+            continue
+        remaining = started + timeout_for(call["name"]) - time.monotonic()
+        try:
+            messages.append(_tool_message(call, future.result(timeout=max(0.0, remaining))))
+        except Exception as e:
+            future.cancel()
+            messages.append(_error_message(call, e))
+    return messages
+
+
+async def arun_tool_calls(tool_calls: list, tools: list) -> list:
+    """Async counterpart of run_tool_calls built on the tools' ainvoke"""
+    tools_by_name = {t.name: t for t in tools}
+
+    async def run(call):
+        selected = tools_by_name.get(call["name"])
+        if selected is None:
+            return _tool_message(call, f"❌ Unknown tool '{call['name']}'", status="error")
+        with span(f"tool.{call['name']}") as s:
+            try:
+                result = await asyncio.wait_for(selected.ainvoke(call["args"]), timeout_for(call["name"]))
+                return _tool_message(call, result)
+            except Exception as e:
+                s.set("error", f"{type(e).__name__}: {e}")
+                return _error_message(call, e)
+
+    return list(await asyncio.gather(*(run(call) for call in tool_calls)))
@@ -1,12 +1,40 @@
 import json
+import threading
+import time
 from langchain.tools import tool
-from models import DataGovScraper,load_model,predict_image,model_path,device,classes,load_model_wheat,predict_image_wheat,wheat_model_path,class_names
+from models.labels import classes, class_names
 import os
-import pandas as pd
 
+from .scheme_catalogue import catalogue
+from .scheme_search import scheme_search
+from .tool_executor import with_async
 
 
-scraper = DataGovScraper()
+# Heavy dependencies are created on a tool's first call (or by warm_up), not at import
+_scraper = None
+_scraper_lock = threading.Lock()
+
+
+def get_scraper():
+    """The shared DataGovScraper, created and set syncing on first use"""
+    global _scraper
+    with _scraper_lock:
+        if _scraper is None:
+            from models import DataGovScraper
+
+            _scraper = DataGovScraper()
+            _scraper.start_background_sync()
+        return _scraper
+
+
+def _load_disease_models():
+    from models import inference_pool, registry
+
+    if inference_pool.enabled:
+        inference_pool.start()
+    else:
+        registry.warm_up()
+
 
 @tool("get_market_price")
 def getMarketPrice(crop: str = "tomato", location: str = "") -> str:
@@ -19,89 +47,80 @@ def getMarketPrice(crop: str = "tomato", location: str = "") -> str:
     Returns:
         Current government market price with location and market details
     """
-    return scraper.get_market_price(crop, location)
+    return get_scraper().get_market_price(crop, location)
 
 @tool("get_crop_locations")  
 def getCropLocations(crop: str = "tomato") -> str:
     """Find which states have data for a specific crop"""
     
     try:
-        params = {
-            'api-key': scraper.api_key,
-            'format': 'json',
-            'limit': '200'
-        }
-        
-        response = scraper.session.get(scraper.api_url, params=params, timeout=15)
+        states_with_crop = get_scraper().get_crop_locations(crop)
         
-        if response.status_code == 200:
-            data = response.json()
-            records = data.get('records', [])
-            
-            # Find states with this crop
-            states_with_crop = set()
-            for record in records:
-                commodity = str(record.get('commodity', '')).lower()
-                state = record.get('state', '')
-                
-                if crop.lower() in commodity:
-                    states_with_crop.add(state)
-            
-            if states_with_crop:
-                states_list = ', '.join(sorted(states_with_crop))
-                return f"📍 {crop.title()} price data available in: {states_list}"
-            else:
-                return f"❌ No {crop} data found in current dataset"
-        
-        return f"❌ Error fetching location data"
+        if states_with_crop:
+            states_list = ', '.join(states_with_crop)
+            return f"📍 {crop.title()} price data available in: {states_list}"
+        else:
+            return f"❌ No {crop} data found in current dataset"
         
     except Exception as e:
         return f"❌ Error: {str(e)}"
 
 
-@tool(description="Disease detection for {classes}")
-def disease_Detect():
-    image_path = r"test\test\AppleCedarRust1.JPG"
-    model = load_model(model_path, num_classes=len(classes), device=device)
-    prediction = predict_image(model, image_path, device=device)
-    return prediction
-
+@tool(description=f"Detect crop disease from a leaf photo. Covers {', '.join(sorted({c.split('___')[0] for c in classes}))} "
+                  f"and wheat ({', '.join(class_names)}). Pass the image as an upload handle (upload://...), "
+                  "a data URL or base64-encoded bytes, plus the crop name if the farmer mentioned it.")
+def detect_crop_disease(image: str, crop: str = "") -> dict:
+    from models import detect_disease
 
-@tool(description="Disease detection for wheat")
-def Wheat_disease_detection():
-    img_path = r"aphid_33.png"
-    model = load_model_wheat(wheat_model_path, num_classes=len(class_names), device=device)
-    label = predict_image_wheat(str(img_path), model, class_names, device)
-    return label
+    result = detect_disease(image, crop)
+    return {
+        "disease": result["label"],
+        "confidence": result["confidence"],
+        "alternatives": result["top_k"][1:],
+        "low_confidence": result["low_confidence"],
+    }
 
 @tool(description="Fetch all available schemes with description and link")
 def Find_scheme():
-    json_file_path  ="scheme.json"
-    file = pd.read_json(json_file_path)
-    des= file["description"]
-    link = file["link"]
-    output_json = []
-    for i in range(len(file)):
-        output_json.append({"description":des[i],"link":link[i]})
-    return output_json
-
-@tool(description="Get the full details of a scheme using its link")
+    return [{"description": s.description, "link": s.link} for s in catalogue.all()]
+
+@tool(description="Search government schemes for farmers. Returns the k best matching schemes "
+                  "(title, link, short description, relevance score). Use the query in the farmer's words.")
+def search_schemes(query: str, k: int = 3):
+    return scheme_search.search(query, k=max(1, min(int(k), 10)))
+
+@tool(description="Get the full details of a scheme using its link from search_schemes")
 def Scheme_detials(correct_link:str):
-    json_file_path  ="scheme.json"
-    file = pd.read_json(json_file_path)
-    link = file["link"]
-    for i in range(len(file)):
-        if link[i] == correct_link:
-            break
-    output = {
-        "title": file["title"][i],
-        "ministry": file["ministry"][i],
-        "description": file["description"][i],
-        "details":file["details"][i],
-        "eligibility":file["eligibility"][i],
-        "application_process": file["application_process"][i],
-        "documents_required": file["documents_required"][i]
-    }
-    return output
+    return catalogue.details(correct_link)
+
+# Each tool also gets an async variant that runs on the I/O or CPU pool under its timeout
+tools = [with_async(t) for t in [getCropLocations,getMarketPrice,detect_crop_disease,search_schemes,Scheme_detials]]
 
-tools = [getCropLocations,getMarketPrice,disease_Detect,Wheat_disease_detection,Scheme_detials,Find_scheme]
\ No newline at end of file
+# What each tool needs loaded before its first call can be fast
+WARM_UPS = {
+    "get_market_price": get_scraper,
+    "get_crop_locations": get_scraper,
+    "detect_crop_disease": _load_disease_models,
+    "search_schemes": lambda: scheme_search.search("kisan"),
+    "Scheme_detials": catalogue.all,
+}
+
+
+def warm_up(names=None):
+    """Load the dependencies of the given tools now (all tools when names is None).
+
+    WARM_TOOLS=all or WARM_TOOLS=get_market_price,search_schemes picks them
+    for the server's startup hook.
+    """
+    done = set()
+    for name in names or WARM_UPS:
+        load = WARM_UPS.get(name)
+        if load is None or load in done:
+            continue
+        started = time.perf_counter()
+        try:
+            load()
+            print(f"Warmed up {name} in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {e}")
+        done.add(load)
\ No newline at end of file